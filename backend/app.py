@@ -1,15 +1,12 @@
-from fastapi import FastAPI
-from fastapi.middleware.cors import CORSMiddleware
-from contextlib import asynccontextmanager
+from utils.startup import startup_timer, warm_up
+
+import asyncio
 import os
 import logging
+from contextlib import asynccontextmanager
 from dotenv import load_dotenv
-from utils.db import db_manager
 
-# Import routers
-from routes import summarize, quiz, homework
-
-# Load environment variables
+# Load environment variables before the modules that read them
 load_dotenv()
 
 # Configure logging
@@ -19,21 +16,66 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+with startup_timer.phase("import fastapi"):
+    from fastapi import FastAPI
+    from fastapi.responses import Response
+    from fastapi.middleware.cors import CORSMiddleware
+
+# The Gemini SDK and PyMuPDF are not imported here; they load on first use or during warmup
+with startup_timer.phase("import app modules"):
+    from lib.database import database
+    from utils.job_queue import SummaryWorkerPool, SUMMARY_WORKERS
+    from utils.summary_pipeline import chunk_summary_cache
+    from utils.llm import single_flight
+    from utils.llm_scheduler import llm_scheduler
+    from utils.metrics import registry, MetricsMiddleware, CONTENT_TYPE_LATEST
+    from utils.responses import FastJSONResponse, CompressionMiddleware
+    from utils.loop_monitor import loop_monitor, LoopMonitorMiddleware, LOOP_MONITOR_ENABLED
+    from utils.health import start_health_probes, stop_health_probes, health_report
+
+with startup_timer.phase("import routers"):
+    from routes import summarize, quiz, homework
+    from routes.homework import homework_cache
+    from routes.quiz import quiz_page_cache
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Application lifespan manager."""
     # Startup
-    try:
-        db_manager.connect()
-        logger.info("Database connected successfully")
-    except Exception as e:
-        logger.error(f"Failed to connect to database: {e}")
+    if LOOP_MONITOR_ENABLED:
+        loop_monitor.start()
+
+    # No network I/O here: Motor connects on first use and warmup pings it in the background
+    with startup_timer.phase("open database client"):
+        database.open()
+
+    # Background summary workers (set SUMMARY_WORKERS=0 to run them only in worker.py)
+    worker_pool = None
+    if SUMMARY_WORKERS > 0:
+        worker_pool = SummaryWorkerPool(SUMMARY_WORKERS)
+        worker_pool.start()
+
+    warmup_task = asyncio.create_task(warm_up())
+    start_health_probes()
+    startup_timer.mark_ready()
+    startup_timer.log("Accepting requests")
 
     yield
 
     # Shutdown
+    if not warmup_task.done():
+        warmup_task.cancel()
+
+    await stop_health_probes()
+
+    if worker_pool:
+        await worker_pool.stop()
+
+    if LOOP_MONITOR_ENABLED:
+        await loop_monitor.stop()
+
     try:
-        db_manager.disconnect()
+        await database.disconnect()
         logger.info("Database disconnected successfully")
     except Exception as e:
         logger.error(f"Error during shutdown: {e}")
@@ -42,7 +84,8 @@ app = FastAPI(
     title="Fonta AI Study Companion API",
     description="AI-powered study companion for Nigerian and African students with Gemini AI",
     version="2.0.0",
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=FastJSONResponse
 )
 
 # Enable CORS for local development
@@ -54,6 +97,15 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# gzip/brotli for large buffered responses (streamed progress passes through)
+app.add_middleware(CompressionMiddleware)
+
+# Per-route request counters and latency histograms
+app.add_middleware(MetricsMiddleware)
+
+# Lets event-loop stalls be attributed to the request that caused them
+app.add_middleware(LoopMonitorMiddleware)
+
 # Include routers
 app.include_router(summarize.router, tags=["Summarization"])
 app.include_router(quiz.router, tags=["Quiz Generation"])
@@ -81,26 +133,80 @@ def test_endpoint():
         "ai": "Gemini Pro"
     }
 
+# Cache, coalescing and scheduler state, read when /api/metrics is scraped
+_caches = {"homework": homework_cache, "chunk_summaries": chunk_summary_cache, "quiz_pages": quiz_page_cache}
+for _stat in ("hits", "misses"):
+    registry.gauge(
+        f"fonta_cache_{_stat}",
+        f"Cache {_stat} since startup",
+        lambda stat=_stat: {(name,): cache.stats()[stat] for name, cache in _caches.items()},
+        ("cache",)
+    )
+registry.gauge(
+    "fonta_llm_single_flight_calls",
+    "Gemini calls started and callers coalesced onto them",
+    lambda: {("started",): single_flight.calls, ("coalesced",): single_flight.coalesced},
+    ("kind",)
+)
+registry.gauge(
+    "fonta_llm_scheduler_queue_depth",
+    "Gemini calls waiting for the scheduler, by priority",
+    lambda: {(level,): depth for level, depth in llm_scheduler.stats()["queue_depth_by_priority"].items()},
+    ("priority",)
+)
+registry.gauge("fonta_llm_scheduler_active", "Gemini calls in flight", lambda: llm_scheduler.stats()["active"])
+registry.gauge(
+    "fonta_llm_scheduler_rate_per_second",
+    "Current Gemini call rate after adaptive backoff",
+    lambda: llm_scheduler.stats()["rate_per_second"]
+)
+registry.gauge(
+    "fonta_llm_throttled",
+    "Gemini 429/5xx responses since startup",
+    lambda: llm_scheduler.throttled
+)
+
+@app.get("/api/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus metrics endpoint."""
+    return Response(content=registry.render(), media_type=CONTENT_TYPE_LATEST)
+
+@app.get("/api/debug/loop-stalls", include_in_schema=False)
+async def loop_stalls():
+    """Event loop lag and recent stalls with the blocked stack of each."""
+    return loop_monitor.stats(include_stacks=True)
+
 @app.get("/api/health")
-def health_check():
-    """Health check endpoint."""
-    try:
-        # Test database connection
-        db_manager.client.admin.command('ping')
-
-        # Check if Gemini API key is configured
-        gemini_configured = bool(os.getenv("GEMINI_API_KEY"))
-
-        return {
-            "status": "healthy",
-            "database": "connected",
-            "api": "running",
-            "gemini_ai": "configured" if gemini_configured else "not_configured"
-        }
-    except Exception as e:
-        return {
-            "status": "unhealthy",
-            "database": "disconnected",
-            "error": str(e)
-        }
+async def health_check():
+    """Health check endpoint (served from cached background probes, no I/O)."""
+    report = health_report()
+    database_status = report["probes"]["database"]["status"]
+    gemini_status = report["probes"]["gemini_ai"]["status"]
+
+    if not os.getenv("GEMINI_API_KEY"):
+        gemini_status = "not_configured"
+
+    if database_status == "down":
+        status = "unhealthy"
+    elif gemini_status != "up" or any(c["state"] != "closed" for c in report["circuits"].values()):
+        status = "degraded"
+    else:
+        status = "healthy"
+
+    return {
+        "status": status,
+        "database": {"up": "connected", "down": "disconnected"}.get(database_status, database_status),
+        "api": "running",
+        "gemini_ai": gemini_status,
+        **report,
+        "caches": {
+            "homework": homework_cache.stats(),
+            "chunk_summaries": chunk_summary_cache.stats(),
+            "quiz_pages": quiz_page_cache.stats()
+        },
+        "llm_single_flight": single_flight.stats(),
+        "llm_scheduler": llm_scheduler.stats(),
+        "event_loop": loop_monitor.stats(),
+        "startup": startup_timer.report()
+    }
 
@@ -0,0 +1,10 @@
+# ===========================================
+# FONTA AI STUDY COMPANION - BENCHMARKS
+# ===========================================
+
+"""
+Offline benchmark suite.
+Measures PDFProcessor on synthetic PDFs and drives the FastAPI app in-process
+against a fake Gemini backend and a local MongoDB stand-in, so runs are
+repeatable and cost nothing. See benchmarks/run.py for usage.
+"""
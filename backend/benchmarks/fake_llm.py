@@ -0,0 +1,120 @@
+# ===========================================
+# FONTA AI STUDY COMPANION - FAKE GEMINI
+# ===========================================
+
+"""
+Stand-in for models.gemini_ai used by the benchmarks.
+Sleeps for a configurable latency with jitter (like a blocking SDK call)
+and returns payloads shaped like real Gemini output.
+"""
+
+import sys
+import time
+import types
+import random
+import threading
+from typing import List, Dict, Optional
+
+class FakeGeminiError(Exception):
+    """Injected failure (see FakeGeminiAI.error_rate)."""
+
+    code = 503
+
+class FakeGeminiAI:
+    """Synchronous fake with the same methods as models.gemini_ai.gemini_ai."""
+
+    def __init__(self, latency: float = 1.0, jitter: float = 0.25, error_rate: float = 0.0, seed: int = 0):
+        """
+        Initialize fake client.
+
+        Args:
+            latency: Mean seconds per call
+            jitter: Maximum +/- seconds added uniformly to each call
+            error_rate: Fraction of calls that raise FakeGeminiError
+            seed: Random seed for jitter and failures
+        """
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.calls = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def _wait(self):
+        with self._lock:
+            self.calls += 1
+            delay = max(0.0, self.latency + self._rng.uniform(-self.jitter, self.jitter))
+            fail = self._rng.random() < self.error_rate
+        time.sleep(delay)
+        if fail:
+            raise FakeGeminiError("Injected Gemini failure")
+
+    def summarize_chunk(self, text: str, page_hint: Optional[str] = None) -> Dict[str, any]:
+        self._wait()
+        sentences = [s.strip() for s in text.split(".") if s.strip()]
+        return {
+            "page_hint": page_hint,
+            "definitions": [s for s in sentences if s.startswith("Definition")][:3],
+            "key_points": sentences[:5],
+            "questions": [f"Explain: {s[:60]}?" for s in sentences[:2]]
+        }
+
+    def merge_chunk_summaries(self, chunk_summaries: List[Dict[str, any]]) -> Dict[str, any]:
+        self._wait()
+        merged = {"title": "Synthetic document", "definitions": [], "key_points": [], "questions": []}
+        for summary in chunk_summaries:
+            for key in ("definitions", "key_points", "questions"):
+                merged[key].extend(summary.get(key, []))
+        for key in ("definitions", "key_points", "questions"):
+            merged[key] = merged[key][:40]
+        return merged
+
+    def generate_quiz(self, summary: Dict[str, any], num_questions: int = 50) -> List[Dict[str, any]]:
+        self._wait()
+        with self._lock:
+            salt = self._rng.getrandbits(32)
+        points = summary.get("key_points") or ["the material"]
+        questions = []
+        for index in range(num_questions):
+            point = points[index % len(points)]
+            if index % 10 < 7:
+                questions.append({
+                    "type": "mcq",
+                    "question": f"Q{salt}-{index}: which statement matches '{point[:50]}'?",
+                    "options": ["A", "B", "C", "D"],
+                    "answer": "A"
+                })
+            else:
+                questions.append({
+                    "type": "short_answer",
+                    "question": f"Q{salt}-{index}: briefly explain '{point[:50]}'.",
+                    "answer": point
+                })
+        return questions
+
+    def get_homework_help(
+        self,
+        question: str,
+        topic: Optional[str] = None,
+        difficulty: Optional[str] = None
+    ) -> Dict[str, any]:
+        self._wait()
+        return {
+            "final_answer": f"Answer to: {question[:80]}",
+            "step_by_step": [f"Step {n}: work through part {n} of the problem." for n in range(1, 5)],
+            "tips": ["Check your units.", "Review the definitions first."]
+        }
+
+def install_fake_gemini(fake: FakeGeminiAI) -> FakeGeminiAI:
+    """
+    Register 'fake' as models.gemini_ai.gemini_ai.
+
+    Must run before the app (utils.llm) is imported.
+    """
+    models = sys.modules.get("models") or types.ModuleType("models")
+    module = types.ModuleType("models.gemini_ai")
+    module.gemini_ai = fake
+    models.gemini_ai = module
+    sys.modules["models"] = models
+    sys.modules["models.gemini_ai"] = module
+    return fake
@@ -0,0 +1,604 @@
+# ===========================================
+# FONTA AI STUDY COMPANION - BENCHMARK RUNNER
+# ===========================================
+
+"""
+Run the offline benchmarks and write machine-readable results.
+
+Suites:
+    pdf  PDFProcessor.process_pdf on synthetic PDFs of each --pages size
+    api  The FastAPI app in-process (httpx ASGI transport) against a fake
+         Gemini backend and a local MongoDB stand-in (mongomock-motor, or a
+         real server with --mongo-uri): summarize (plain and streamed),
+         get_summary, quiz generation and pages, homework, and paginated
+         summary/homework history
+    serialization
+         JSON encoding (stdlib json vs the app's renderer) and gzip/brotli
+         compression of summary, quiz and history-list payloads
+
+Usage (from backend/):
+    pip install -r benchmarks/requirements.txt
+    python -m benchmarks.run --suite pdf --pages 10,50,100,400
+    python -m benchmarks.run --suite api --requests 40 --concurrency 8 --llm-latency 0.5
+    python -m benchmarks.run --suite serialization --serialization-runs 50
+    python -m benchmarks.run --output new.json --compare old.json
+
+Each scenario reports request count, errors, throughput, p50/p95/p99
+latency and peak RSS growth (sampled while it runs). Results are JSON so
+runs can be compared with --compare. A scenario with any non-2xx response
+is marked invalid: its timings are dropped and the run exits non-zero.
+mongomock-motor cannot evaluate aggregation expressions in projections, so
+on the stand-in the summary history is listed with plain fields only.
+"""
+
+import os
+import sys
+import json
+import math
+import time
+import asyncio
+import argparse
+import platform
+import threading
+import subprocess
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Dict, List, Optional
+import logging
+
+from utils.memory import current_rss_bytes
+
+logger = logging.getLogger(__name__)
+
+MB = 1024 * 1024
+
+# ===========================================
+# MEASUREMENT HELPERS
+# ===========================================
+
+class RssSampler:
+    """Sample RSS in a background thread to find the peak during a block of work."""
+
+    def __init__(self, interval: float = 0.01):
+        self.interval = interval
+        self.start_rss = 0
+        self.peak_rss = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.peak_rss = max(self.peak_rss, current_rss_bytes())
+            self._stop.wait(self.interval)
+
+    def __enter__(self) -> "RssSampler":
+        self.start_rss = self.peak_rss = current_rss_bytes()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak_rss = max(self.peak_rss, current_rss_bytes())
+
+    def report(self) -> Dict[str, float]:
+        return {
+            "peak_rss_mb": round(self.peak_rss / MB, 1),
+            "peak_rss_growth_mb": round(max(0, self.peak_rss - self.start_rss) / MB, 1)
+        }
+
+def percentile(sorted_values: List[float], fraction: float) -> Optional[float]:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, math.ceil(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+def latency_stats(latencies: List[float]) -> Dict[str, Optional[float]]:
+    """p50/p95/p99/mean/max in milliseconds."""
+    ordered = sorted(latencies)
+
+    def ms(value: Optional[float]) -> Optional[float]:
+        return None if value is None else round(value * 1000, 1)
+
+    return {
+        "p50_ms": ms(percentile(ordered, 0.50)),
+        "p95_ms": ms(percentile(ordered, 0.95)),
+        "p99_ms": ms(percentile(ordered, 0.99)),
+        "mean_ms": ms(sum(ordered) / len(ordered)) if ordered else None,
+        "max_ms": ms(ordered[-1]) if ordered else None
+    }
+
+async def run_scenario(
+    name: str,
+    request: Callable[[int], Awaitable[int]],
+    requests: int,
+    concurrency: int
+) -> Dict[str, any]:
+    """
+    Issue 'requests' calls of request(i) with at most 'concurrency' in flight.
+
+    Args:
+        name: Scenario name in the results
+        request: Coroutine function returning the HTTP status of call i
+        requests: Number of calls
+        concurrency: Maximum calls in flight
+
+    Returns:
+        Scenario results
+    """
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    latencies: List[float] = []
+    statuses: Dict[str, int] = {}
+    errors = 0
+
+    async def one(index: int):
+        nonlocal errors
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                status = await request(index)
+            except Exception as e:
+                logger.error(f"{name} request {index} raised: {e}")
+                status = 0
+            latencies.append(time.perf_counter() - started)
+            statuses[str(status)] = statuses.get(str(status), 0) + 1
+            if not 200 <= status < 300:
+                errors += 1
+
+    with RssSampler() as sampler:
+        started = time.perf_counter()
+        await asyncio.gather(*(one(index) for index in range(requests)))
+        wall = time.perf_counter() - started
+
+    result = {
+        "scenario": name,
+        "requests": requests,
+        "concurrency": concurrency,
+        "errors": errors,
+        "status_codes": statuses,
+        "wall_seconds": round(wall, 3),
+        "throughput_rps": round(requests / wall, 2) if wall > 0 else None,
+        **latency_stats(latencies),
+        **sampler.report(),
+        "valid": errors == 0
+    }
+    if errors:
+        # Timings of error responses say nothing about the endpoint; keep them out of comparisons
+        for metric in ("throughput_rps", "p50_ms", "p95_ms", "p99_ms", "mean_ms", "max_ms"):
+            result[metric] = None
+        logger.error(f"{name}: invalid, {errors} of {requests} requests failed ({statuses})")
+        return result
+
+    logger.info(
+        f"{name}: {result['throughput_rps']} req/s, p50 {result['p50_ms']} ms, "
+        f"p95 {result['p95_ms']} ms, p99 {result['p99_ms']} ms, {errors} errors"
+    )
+    return result
+
+# ===========================================
+# PDF PROCESSOR SUITE
+# ===========================================
+
+def run_pdf_suite(page_counts: List[int], repeats: int, words_per_page: int) -> List[Dict[str, any]]:
+    """Benchmark PDFProcessor.process_pdf on its own for each document size."""
+    from benchmarks.synthetic_pdf import make_pdf
+    from utils.pdf_processor import PDFProcessor
+
+    results = []
+    for pages in page_counts:
+        content = make_pdf(pages, words_per_page=words_per_page, seed=pages)
+        processor = PDFProcessor(chunk_size=2000, overlap=200, max_pages=max(pages, 1))
+
+        latencies = []
+        with RssSampler() as sampler:
+            for _ in range(max(1, repeats)):
+                started = time.perf_counter()
+                pdf_data = processor.process_pdf(content)
+                latencies.append(time.perf_counter() - started)
+
+        mean = sum(latencies) / len(latencies)
+        result = {
+            "scenario": f"pdf_processor/{pages}_pages",
+            "pages": pages,
+            "size_bytes": len(content),
+            "chunks": len(pdf_data['chunks']),
+            "total_words": pdf_data['total_words'],
+            "runs": len(latencies),
+            "pages_per_second": round(pages / mean, 1) if mean > 0 else None,
+            **latency_stats(latencies),
+            **sampler.report()
+        }
+        logger.info(
+            f"{result['scenario']}: {result['chunks']} chunks, p50 {result['p50_ms']} ms, "
+            f"{result['pages_per_second']} pages/s"
+        )
+        results.append(result)
+    return results
+
+# ===========================================
+# SERIALIZATION SUITE
+# ===========================================
+
+def _sample_payloads() -> Dict[str, any]:
+    """Response bodies shaped like the app's largest ones, with ObjectId/datetime values."""
+    import random
+    from bson import ObjectId
+
+    rng = random.Random(7)
+    words = ["cell", "energy", "market", "theorem", "protein", "voltage", "policy", "enzyme", "vector", "climate"]
+
+    def sentence(length: int) -> str:
+        return " ".join(rng.choice(words) for _ in range(length)).capitalize() + "."
+
+    summary = {
+        "_id": ObjectId(),
+        "user_id": "bench-user",
+        "file_name": "lecture-notes.pdf",
+        "pages": 200,
+        "total_words": 80000,
+        "created_at": datetime.utcnow(),
+        "summary": {
+            "title": sentence(6),
+            "overview": " ".join(sentence(20) for _ in range(10)),
+            "sections": [
+                {
+                    "heading": sentence(4),
+                    "key_points": [sentence(18) for _ in range(8)],
+                    "definitions": [{"term": rng.choice(words), "definition": sentence(25)} for _ in range(4)]
+                }
+                for _ in range(40)
+            ]
+        }
+    }
+    quiz = {
+        "_id": ObjectId(),
+        "summary_id": str(summary["_id"]),
+        "created_at": datetime.utcnow(),
+        "questions": [
+            {
+                "question": sentence(16),
+                "options": [sentence(6) for _ in range(4)],
+                "correct_answer": "A",
+                "explanation": sentence(30)
+            }
+            for _ in range(50)
+        ]
+    }
+    history = {
+        "status": "success",
+        "count": 100,
+        "data": [
+            {"_id": ObjectId(), "file_name": f"notes-{i}.pdf", "title": sentence(6), "pages": rng.randint(1, 400), "created_at": datetime.utcnow()}
+            for i in range(100)
+        ],
+        "next_cursor": None
+    }
+    return {"summary": summary, "quiz": quiz, "history_list": history}
+
+def _time_runs(fn: Callable[[], any], runs: int) -> List[float]:
+    latencies = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        fn()
+        latencies.append(time.perf_counter() - started)
+    return latencies
+
+def run_serialization_suite(runs: int) -> List[Dict[str, any]]:
+    """Benchmark JSON encoding and response compression on representative payloads."""
+    from utils import responses
+
+    def stdlib_json(content) -> bytes:
+        # What the routes did before: str() the ObjectIds, then the standard encoder
+        return json.dumps(content, default=str).encode("utf-8")
+
+    encodings = ["gzip"] + (["br"] if responses.brotli is not None else [])
+    serializer = "orjson" if responses.orjson is not None else "json (orjson not installed)"
+
+    results = []
+    for name, payload in _sample_payloads().items():
+        body = responses.render_json(payload)
+        for label, encode in (("stdlib_json", stdlib_json), ("render_json", responses.render_json)):
+            result = {
+                "scenario": f"serialization/{name}/{label}",
+                "serializer": serializer if label == "render_json" else "json",
+                "size_bytes": len(encode(payload)),
+                "runs": runs,
+                **latency_stats(_time_runs(lambda: encode(payload), runs))
+            }
+            logger.info(f"{result['scenario']}: {result['size_bytes']} bytes, p50 {result['p50_ms']} ms")
+            results.append(result)
+
+        for encoding in encodings:
+            compressed = responses.compress(body, encoding)
+            result = {
+                "scenario": f"serialization/{name}/{encoding}",
+                "size_bytes": len(body),
+                "compressed_bytes": len(compressed),
+                "ratio": round(len(body) / len(compressed), 2),
+                "runs": runs,
+                **latency_stats(_time_runs(lambda: responses.compress(body, encoding), runs))
+            }
+            logger.info(
+                f"{result['scenario']}: {result['size_bytes']} -> {result['compressed_bytes']} bytes "
+                f"(x{result['ratio']}), p50 {result['p50_ms']} ms"
+            )
+            results.append(result)
+    return results
+
+# ===========================================
+# API SUITE
+# ===========================================
+
+async def _connect_database(mongo_uri: Optional[str]):
+    """Point lib.database at a real server (throwaway database) or mongomock-motor."""
+    from lib.database import database
+
+    if mongo_uri:
+        database.mongo_url = mongo_uri
+        database.database_name = f"fonta_bench_{int(time.time())}"
+        await database.connect()
+        return
+
+    try:
+        from mongomock_motor import AsyncMongoMockClient
+    except ImportError:
+        raise SystemExit("The api suite needs mongomock-motor (pip install -r benchmarks/requirements.txt) or --mongo-uri")
+
+    database.client = AsyncMongoMockClient()
+    database.database = database.client["fonta_bench"]
+    try:
+        await database.ensure_indexes()
+    except Exception as e:
+        logger.warning(f"Index creation not supported by the MongoDB stand-in: {e}")
+
+# User whose seeded history the pagination scenarios walk
+HISTORY_USER = "bench-history"
+HISTORY_DOCS = 200
+HISTORY_PAGES_PER_REQUEST = 3
+
+async def _seed_history():
+    """Give HISTORY_USER a long summary and homework history to paginate through."""
+    from lib.database import get_summaries_collection, get_homework_collection
+
+    started = datetime(2024, 1, 1)
+    summaries = []
+    homework = []
+    for index in range(HISTORY_DOCS):
+        created_at = (started + timedelta(minutes=index)).isoformat()
+        summaries.append({
+            "user_id": HISTORY_USER,
+            "file_name": f"history-{index}.pdf",
+            "pages": 20,
+            "total_words": 8000,
+            "summary": {"title": f"History document {index}", "overview": "Seeded for pagination benchmarks."},
+            "created_at": created_at
+        })
+        homework.append({
+            "user_id": HISTORY_USER,
+            "question": f"Seeded question {index}",
+            "topic": "Mathematics",
+            "difficulty": "medium",
+            "solution": {"final_answer": str(index), "step_by_step": [], "tips": []},
+            "created_at": created_at
+        })
+    await get_summaries_collection().insert_many(summaries)
+    await get_homework_collection().insert_many(homework)
+
+async def _disconnect_database(mongo_uri: Optional[str]):
+    from lib.database import database
+
+    if mongo_uri:
+        await database.client.drop_database(database.database_name)
+        await database.disconnect()
+
+async def run_api_suite(args) -> List[Dict[str, any]]:
+    """Drive summarize, quiz and homework endpoints in-process."""
+    import httpx
+    from benchmarks.fake_llm import FakeGeminiAI, install_fake_gemini
+    from benchmarks.synthetic_pdf import make_pdf
+
+    # The fake must be registered before utils.llm imports models.gemini_ai
+    fake = install_fake_gemini(FakeGeminiAI(args.llm_latency, args.llm_jitter, args.llm_error_rate))
+    from app import app
+
+    await _connect_database(args.mongo_uri)
+    await _seed_history()
+
+    # Distinct seeds keep every upload out of the summary and chunk caches
+    pdfs = [make_pdf(args.api_pages, seed=1000 + index) for index in range(args.requests)]
+    stream_pdfs = [make_pdf(args.api_pages, seed=5000 + index) for index in range(args.requests)]
+
+    # The stand-in cannot compute the summary title expression; a real server lists the defaults
+    summary_fields = None if args.mongo_uri else "file_name,pages,total_words"
+    summary_ids: List[str] = []
+    quiz_ids: List[str] = []
+    results = []
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+
+        async def summarize(index: int) -> int:
+            response = await client.post(
+                "/api/summarize-pdf",
+                files={"file": (f"bench-{index}.pdf", pdfs[index], "application/pdf")},
+                data={"user_id": f"bench-user-{index}"}
+            )
+            if response.status_code == 200:
+                summary_ids.append(response.json()["summary_id"])
+            return response.status_code
+
+        async def generate_quiz(index: int) -> int:
+            # One user per request so free-tier quotas do not turn into 402s
+            response = await client.post(
+                "/api/generate-quiz",
+                json={"user_id": f"bench-quiz-{index}", "summary_id": summary_ids[index % len(summary_ids)]}
+            )
+            if response.status_code == 200:
+                quiz_ids.append(response.json()["quiz_id"])
+            return response.status_code
+
+        async def summarize_stream(index: int) -> int:
+            async with client.stream(
+                "POST",
+                "/api/summarize-pdf/stream",
+                files={"file": (f"bench-stream-{index}.pdf", stream_pdfs[index], "application/pdf")},
+                data={"user_id": f"bench-stream-{index}"}
+            ) as response:
+                last_event: Dict[str, any] = {}
+                async for line in response.aiter_lines():
+                    if line:
+                        last_event = json.loads(line)
+            if response.status_code == 200 and last_event.get("event") != "summary":
+                # The stream itself succeeds; a failed summary arrives as an 'error' event
+                return last_event.get("status_code", 500)
+            return response.status_code
+
+        async def get_summary(index: int) -> int:
+            response = await client.get(f"/api/summaries/{summary_ids[index % len(summary_ids)]}")
+            return response.status_code
+
+        async def walk_history(path: str, fields: Optional[str]) -> int:
+            """Fetch the first HISTORY_PAGES_PER_REQUEST pages, following next_cursor."""
+            params = {"user_id": HISTORY_USER, "limit": 20}
+            if fields:
+                params["fields"] = fields
+            for _ in range(HISTORY_PAGES_PER_REQUEST):
+                response = await client.get(path, params=params)
+                if response.status_code != 200:
+                    return response.status_code
+                next_cursor = response.json()["next_cursor"]
+                if not next_cursor:
+                    break
+                params["cursor"] = next_cursor
+            return response.status_code
+
+        async def quiz_page(index: int) -> int:
+            response = await client.get(f"/api/quiz/{quiz_ids[index % len(quiz_ids)]}", params={"page": index % 10 + 1})
+            return response.status_code
+
+        async def homework(index: int) -> int:
+            response = await client.post(
+                "/api/homework-helper",
+                json={"user_id": f"bench-user-{index}", "question": f"Solve problem {index}: x + {index} = {2 * index}"}
+            )
+            return response.status_code
+
+        async def list_summaries(index: int) -> int:
+            return await walk_history("/api/summaries", summary_fields)
+
+        async def list_homework(index: int) -> int:
+            return await walk_history("/api/homework", None)
+
+        results.append(await run_scenario("api/summarize_pdf", summarize, args.requests, args.concurrency))
+        results.append(await run_scenario("api/summarize_pdf_stream", summarize_stream, args.requests, args.concurrency))
+        if summary_ids:
+            results.append(await run_scenario("api/get_summary", get_summary, args.requests * 5, args.concurrency))
+            results.append(await run_scenario("api/generate_quiz", generate_quiz, args.requests, args.concurrency))
+        if quiz_ids:
+            results.append(await run_scenario("api/quiz_page", quiz_page, args.requests * 5, args.concurrency))
+        results.append(await run_scenario("api/homework_helper", homework, args.requests, args.concurrency))
+        results.append(await run_scenario("api/list_summaries", list_summaries, args.requests, args.concurrency))
+        results.append(await run_scenario("api/list_homework", list_homework, args.requests, args.concurrency))
+
+    await _disconnect_database(args.mongo_uri)
+
+    for result in results:
+        result["api_pages"] = args.api_pages
+    logger.info(f"Fake Gemini served {fake.calls} calls")
+    return results
+
+# ===========================================
+# REPORTING
+# ===========================================
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True, stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def compare(current: Dict[str, any], baseline: Dict[str, any]) -> List[str]:
+    """Human-readable per-scenario change against a previous results file."""
+    previous = {result["scenario"]: result for result in baseline.get("results", [])}
+    lines = []
+    for result in current["results"]:
+        before = previous.get(result["scenario"])
+        if not before:
+            continue
+        changes = []
+        for metric in ("p50_ms", "p95_ms", "p99_ms", "throughput_rps", "peak_rss_growth_mb"):
+            old, new = before.get(metric), result.get(metric)
+            if old and new is not None:
+                changes.append(f"{metric} {old} -> {new} ({(new - old) / old * 100:+.1f}%)")
+        lines.append(f"{result['scenario']}: " + ", ".join(changes))
+    return lines
+
+def parse_args(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Fonta offline benchmarks")
+    parser.add_argument("--suite", default="pdf,api,serialization", help="Comma-separated suites: pdf, api, serialization")
+    parser.add_argument("--pages", default="10,50,100,200,400", help="PDF sizes for the pdf suite")
+    parser.add_argument("--words-per-page", type=int, default=400)
+    parser.add_argument("--repeats", type=int, default=3, help="process_pdf runs per PDF size")
+    parser.add_argument("--api-pages", type=int, default=20, help="Pages per uploaded PDF in the api suite")
+    parser.add_argument("--requests", type=int, default=20, help="Requests per api scenario")
+    parser.add_argument("--concurrency", type=int, default=4, help="Requests in flight per api scenario")
+    parser.add_argument("--serialization-runs", type=int, default=20, help="Encode/compress runs per payload")
+    parser.add_argument("--llm-latency", type=float, default=1.0, help="Mean fake Gemini latency (seconds)")
+    parser.add_argument("--llm-jitter", type=float, default=0.25, help="Uniform +/- jitter (seconds)")
+    parser.add_argument("--llm-error-rate", type=float, default=0.0, help="Fraction of fake Gemini calls that fail")
+    parser.add_argument("--mongo-uri", default=None, help="Use a real MongoDB (throwaway database) instead of mongomock")
+    parser.add_argument("--output", default=None, help="Write JSON results here (default: stdout)")
+    parser.add_argument("--compare", default=None, help="Previous results file to compare against")
+    return parser.parse_args(argv)
+
+def main(argv: Optional[List[str]] = None):
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    args = parse_args(argv)
+    suites = {suite.strip() for suite in args.suite.split(",") if suite.strip()}
+
+    # Background job workers would compete with the measured requests
+    os.environ.setdefault("SUMMARY_WORKERS", "0")
+
+    results = []
+    if "pdf" in suites:
+        page_counts = [int(pages) for pages in args.pages.split(",") if pages.strip()]
+        results.extend(run_pdf_suite(page_counts, args.repeats, args.words_per_page))
+    if "api" in suites:
+        results.extend(asyncio.run(run_api_suite(args)))
+    if "serialization" in suites:
+        results.extend(run_serialization_suite(args.serialization_runs))
+
+    report = {
+        "meta": {
+            "timestamp": datetime.utcnow().isoformat(),
+            "git_commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "args": vars(args)
+        },
+        "results": results
+    }
+
+    encoded = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as output:
+            output.write(encoded + "\n")
+        logger.info(f"Results written to {args.output}")
+    else:
+        print(encoded)
+
+    invalid = [result["scenario"] for result in results if result.get("valid") is False]
+
+    if args.compare:
+        with open(args.compare) as baseline_file:
+            baseline = json.load(baseline_file)
+        for line in compare(report, baseline):
+            print(line, file=sys.stderr)
+
+    if invalid:
+        raise SystemExit(f"Invalid scenarios (non-2xx responses): {', '.join(invalid)}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+# ===========================================
+# FONTA AI STUDY COMPANION - SYNTHETIC PDFS
+# ===========================================
+
+"""
+Deterministic synthetic lecture-note PDFs for benchmarking.
+Pages hold sentence-structured text with occasional definitions, so the
+chunker sees the same kind of input as real course material.
+"""
+
+import random
+from typing import List
+
+import fitz  # PyMuPDF
+
+_TOPICS = [
+    "photosynthesis", "cell division", "supply and demand", "Newton's laws",
+    "chemical bonding", "the nervous system", "inflation", "plate tectonics",
+    "electric circuits", "the French Revolution", "probability", "ecosystems"
+]
+
+_WORDS = (
+    "process energy system structure function reaction force market value cell "
+    "particle theory model evidence result change rate pressure temperature "
+    "population resource policy signal response balance cycle pattern factor "
+    "element compound motion growth layer network current field measure"
+).split()
+
+def _sentence(rng: random.Random) -> str:
+    words = [rng.choice(_WORDS) for _ in range(rng.randint(8, 22))]
+    return words[0].capitalize() + " " + " ".join(words[1:]) + "."
+
+def _page_text(rng: random.Random, page_number: int, words_per_page: int) -> str:
+    topic = rng.choice(_TOPICS)
+    parts: List[str] = [f"Lecture {page_number}: {topic.title()}"]
+    word_count = 0
+
+    while word_count < words_per_page:
+        if rng.random() < 0.08:
+            sentence = f"Definition: {topic} is the {rng.choice(_WORDS)} by which {_sentence(rng).lower()}"
+        else:
+            sentence = _sentence(rng)
+        parts.append(sentence)
+        word_count += len(sentence.split())
+
+    return " ".join(parts)
+
+def make_pdf(pages: int, words_per_page: int = 400, seed: int = 0) -> bytes:
+    """
+    Build a synthetic PDF.
+
+    Args:
+        pages: Number of pages
+        words_per_page: Approximate words of body text per page
+        seed: Random seed; different seeds give different text (and cache keys)
+
+    Returns:
+        PDF bytes
+    """
+    rng = random.Random(seed)
+    doc = fitz.open()
+    try:
+        for page_number in range(1, pages + 1):
+            page = doc.new_page()
+            rect = fitz.Rect(50, 50, page.rect.width - 50, page.rect.height - 50)
+            page.insert_textbox(rect, _page_text(rng, page_number, words_per_page), fontsize=8)
+        return doc.tobytes()
+    finally:
+        doc.close()
@@ -16,13 +16,48 @@ Version: 1.0.0
 """
 
 import os
-from motor.motor_asyncio import AsyncIOMotorClient
-from pymongo import MongoClient
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorCollection
+from pymongo import monitoring
 from typing import Optional
 import logging
 
+from utils.circuit_breaker import CircuitBreaker
+
 logger = logging.getLogger(__name__)
 
+# Opens when MongoDB commands or server heartbeats keep failing; collections are
+# then refused with a 503 instead of every request waiting on server selection
+database_breaker = CircuitBreaker("Database")
+
+class _BreakerCommandListener(monitoring.CommandListener):
+    """Feed command outcomes to the breaker (only client-side errors count as failures)."""
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        database_breaker.record_success()
+
+    def failed(self, event):
+        # Network errors and timeouts carry an 'errtype'; server replies
+        # (duplicate keys, validation errors...) mean the server is up
+        if isinstance(event.failure, dict) and "errtype" in event.failure:
+            database_breaker.record_failure()
+        else:
+            database_breaker.record_success()
+
+class _BreakerHeartbeatListener(monitoring.ServerHeartbeatListener):
+    """Count failed server heartbeats, which catch an unreachable server between commands."""
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        database_breaker.record_failure()
+
 class Database:
     """MongoDB database connection manager."""
     
@@ -32,52 +67,91 @@ class Database:
         self.mongo_url = os.getenv("MONGO_URI", "mongodb://localhost:27017")
         self.database_name = os.getenv("DATABASE_NAME", "fonta_ai_db")
     
+    def open(self):
+        """
+        Create the client without any network I/O.
+
+        Motor connects lazily, so collections are usable immediately and the
+        first operation (or warm_up) establishes the connection.
+        """
+        if self.client is None:
+            self.client = AsyncIOMotorClient(
+                self.mongo_url,
+                event_listeners=[_BreakerCommandListener(), _BreakerHeartbeatListener()]
+            )
+            self.database = self.client[self.database_name]
+
     async def connect(self):
         """Connect to MongoDB database."""
         try:
-            self.client = AsyncIOMotorClient(self.mongo_url)
-            self.database = self.client[self.database_name]
-            
-            # Test the connection
-            await self.client.admin.command('ping')
-            logger.info(f"Connected to MongoDB database: {self.database_name}")
-            
+            self.open()
+            await self.warm_up()
         except Exception as e:
             logger.error(f"Failed to connect to MongoDB: {e}")
             raise
+
+    async def warm_up(self):
+        """Ping the server (opening the connection pool) and ensure indexes."""
+        # Test the connection
+        await self.client.admin.command('ping')
+        logger.info(f"Connected to MongoDB database: {self.database_name}")
+
+        await self.ensure_indexes()
     
+    async def ensure_indexes(self):
+        """Create the indexes the API relies on (no-op if they already exist)."""
+        # Keyset-paginated history: (user_id, created_at, _id) newest first
+        history_index = [("user_id", 1), ("created_at", -1), ("_id", -1)]
+        for collection_name in ("summaries", "quizzes", "homework_requests"):
+            await self.database[collection_name].create_index(history_index)
+
+        # Content-addressed summary cache lookups
+        await self.database["summaries"].create_index([("content_hash", 1), ("user_id", 1)])
+
+        # LLM output cache entries expire at their 'expires_at' timestamp
+        await self.database["chunk_summaries"].create_index("expires_at", expireAfterSeconds=0)
+        await self.database["homework_cache"].create_index("expires_at", expireAfterSeconds=0)
+        await self.database["quiz_pregenerations"].create_index("expires_at", expireAfterSeconds=0)
+
+        # Summary job queue: workers claim the oldest queued or lease-expired job
+        await self.database["summary_jobs"].create_index([("status", 1), ("created_at", 1)])
+        await self.database["summary_jobs"].create_index([("status", 1), ("lease_expires_at", 1)])
+
     async def disconnect(self):
         """Disconnect from MongoDB database."""
         if self.client:
             self.client.close()
+            self.client = None
+            self.database = None
             logger.info("Disconnected from MongoDB")
     
-    def get_collection(self, collection_name: str):
-        """Get a collection from the database."""
-        if not self.database:
+    def get_collection(self, collection_name: str) -> AsyncIOMotorCollection:
+        """Get a collection from the database (raises CircuitOpenError while MongoDB is failing)."""
+        if self.database is None:
             raise Exception("Database not connected. Call connect() first.")
+        database_breaker.before_call()
         return self.database[collection_name]
 
 # Global database instance
 database = Database()
 
 # Collections
-def get_users_collection():
+def get_users_collection() -> AsyncIOMotorCollection:
     """Get users collection."""
     return database.get_collection("users")
 
-def get_quizzes_collection():
+def get_quizzes_collection() -> AsyncIOMotorCollection:
     """Get quizzes collection."""
     return database.get_collection("quizzes")
 
-def get_summaries_collection():
+def get_summaries_collection() -> AsyncIOMotorCollection:
     """Get summaries collection."""
     return database.get_collection("summaries")
 
-def get_homework_collection():
-    """Get homework help collection."""
-    return database.get_collection("homework_help")
+def get_homework_collection() -> AsyncIOMotorCollection:
+    """Get homework requests collection."""
+    return database.get_collection("homework_requests")
 
-def get_shared_quizzes_collection():
+def get_shared_quizzes_collection() -> AsyncIOMotorCollection:
     """Get shared quizzes collection."""
     return database.get_collection("shared_quizzes")
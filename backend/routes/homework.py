@@ -7,18 +7,73 @@ API routes for homework help with step-by-step solutions.
 Provides detailed explanations with tips and study recommendations.
 """
 
+import os
+import re
+import hashlib
+import unicodedata
 from datetime import datetime
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Query
 from pydantic import BaseModel
 from typing import Optional, List
 import logging
 
-from models.gemini_ai import gemini_ai
-from utils.db import get_homework_collection
+from utils import llm
+from utils.cache import TieredCache
+from utils.responses import FastJSONResponse
+from utils.pagination import paginate_history, history_projection, DEFAULT_PAGE_LIMIT, MAX_PAGE_LIMIT
+from lib.database import get_homework_collection
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
+# Answers to common questions are shared across students
+homework_cache = TieredCache(
+    "homework_cache",
+    maxsize=int(os.getenv("HOMEWORK_CACHE_SIZE", "4096")),
+    ttl=float(os.getenv("HOMEWORK_CACHE_TTL_DAYS", "7")) * 24 * 3600
+)
+
+# Fields the homework list can return; full solutions only on request
+HOMEWORK_LIST_FIELDS = {
+    "question": 1,
+    "topic": 1,
+    "difficulty": 1,
+    "final_answer": "$solution.final_answer",
+    "solution": 1,
+    "created_at": 1
+}
+HOMEWORK_LIST_DEFAULT_FIELDS = ["question", "topic", "difficulty", "created_at"]
+
+# Punctuation that never changes a question's meaning: quote marks and
+# sentence-final '?', '.' and '!'. An apostrophe or '!' right after a letter,
+# digit or ')' is kept, since there it is a prime (y') or a factorial (10!)
+_IGNORED_PUNCTUATION = re.compile(
+    r"[\"`“”‘]"
+    r"|(?<![\w)])['’]"
+    r"|(?:[?.]|(?<![\w)])!)+(?=\s|$)"
+)
+
+# Bumped whenever normalization changes, so keys from older rules are never reused
+NORMALIZATION_VERSION = 2
+
+def normalize_question_text(text: Optional[str]) -> str:
+    """Case-fold, drop insignificant punctuation and collapse whitespace."""
+    if not text:
+        return ""
+    text = unicodedata.normalize("NFKC", text).casefold()
+    text = _IGNORED_PUNCTUATION.sub(" ", text)
+    return " ".join(text.split())
+
+def homework_cache_key(question: str, topic: Optional[str], difficulty: Optional[str]) -> str:
+    """Cache key for a normalized (question, topic, difficulty) triple."""
+    normalized = "\x1f".join(
+        normalize_question_text(part) for part in (question, topic, difficulty)
+    )
+    digest = hashlib.sha256(normalized.encode("utf-8"))
+    digest.update(f"prompt:{llm.PROMPT_VERSION}".encode())
+    digest.update(f"normalize:{NORMALIZATION_VERSION}".encode())
+    return digest.hexdigest()
+
 class HomeworkHelpRequest(BaseModel):
     user_id: str
     question: str
@@ -32,6 +87,7 @@ class HomeworkHelpResponse(BaseModel):
     step_by_step: List[str]
     tips: List[str]
     created_at: str
+    cached: bool = False
 
 @router.post("/api/homework-helper", response_model=HomeworkHelpResponse)
 async def get_homework_help(request: HomeworkHelpRequest):
@@ -50,12 +106,20 @@ async def get_homework_help(request: HomeworkHelpRequest):
     try:
         logger.info(f"Processing homework help request for user: {request.user_id}")
 
-        # Generate homework solution
-        solution = gemini_ai.get_homework_help(
-            question=request.question,
-            topic=request.topic,
-            difficulty=request.difficulty
-        )
+        # Near-identical questions are answered from the cache without calling Gemini
+        cache_key = homework_cache_key(request.question, request.topic, request.difficulty)
+        solution = await homework_cache.get(cache_key)
+        cached = solution is not None
+
+        if not cached:
+            # Generate homework solution; concurrent askers of the same question share one Gemini call
+            solution = await llm.get_homework_help(
+                question=request.question,
+                topic=request.topic,
+                difficulty=request.difficulty,
+                coalesce_key=cache_key
+            )
+            await homework_cache.set(cache_key, solution)
 
         # Store request in database
         homework_collection = get_homework_collection()
@@ -68,10 +132,10 @@ async def get_homework_help(request: HomeworkHelpRequest):
             "created_at": datetime.utcnow().isoformat()
         }
 
-        result = homework_collection.insert_one(homework_doc)
+        result = await homework_collection.insert_one(homework_doc)
         request_id = str(result.inserted_id)
 
-        logger.info(f"Homework help saved with ID: {request_id}")
+        logger.info(f"Homework help saved with ID: {request_id}" + (" (cached answer)" if cached else ""))
 
         return HomeworkHelpResponse(
             request_id=request_id,
@@ -79,9 +143,12 @@ async def get_homework_help(request: HomeworkHelpRequest):
             final_answer=solution.get('final_answer', ''),
             step_by_step=solution.get('step_by_step', []),
             tips=solution.get('tips', []),
-            created_at=homework_doc['created_at']
+            created_at=homework_doc['created_at'],
+            cached=cached
         )
 
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error processing homework help: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to generate homework help: {str(e)}")
@@ -93,37 +160,42 @@ async def get_homework_request(request_id: str):
         from bson import ObjectId
         homework_collection = get_homework_collection()
 
-        homework = homework_collection.find_one({"_id": ObjectId(request_id)})
+        homework = await homework_collection.find_one({"_id": ObjectId(request_id)})
 
         if not homework:
             raise HTTPException(status_code=404, detail="Homework request not found")
 
-        # Convert ObjectId to string
-        homework['_id'] = str(homework['_id'])
-        return homework
+        return FastJSONResponse(homework)
 
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error fetching homework request: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/api/homework")
-async def get_user_homework(user_id: str):
-    """Get all homework help requests for a user."""
+async def get_user_homework(
+    user_id: str,
+    limit: int = Query(DEFAULT_PAGE_LIMIT, ge=1, le=MAX_PAGE_LIMIT),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return (default: metadata only)")
+):
+    """Get a page of homework help requests for a user, newest first."""
     try:
         homework_collection = get_homework_collection()
 
-        homework_list = list(homework_collection.find({"user_id": user_id}).sort("created_at", -1))
+        projection = history_projection(fields, HOMEWORK_LIST_FIELDS, HOMEWORK_LIST_DEFAULT_FIELDS)
+        homework_list, next_cursor = await paginate_history(homework_collection, user_id, limit, cursor, projection)
 
-        # Convert ObjectIds to strings
-        for homework in homework_list:
-            homework['_id'] = str(homework['_id'])
-
-        return {
+        return FastJSONResponse({
             "status": "success",
             "count": len(homework_list),
-            "data": homework_list
-        }
+            "data": homework_list,
+            "next_cursor": next_cursor
+        })
 
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error fetching homework requests: {e}")
         raise HTTPException(status_code=500, detail=str(e))
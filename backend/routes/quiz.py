@@ -7,14 +7,19 @@ API routes for quiz generation with pagination and attempt limits.
 Generates 50 questions (35 MCQ + 15 short answer) with 5 questions per page.
 """
 
+import os
 from datetime import datetime
 from fastapi import APIRouter, HTTPException, Query
 from pydantic import BaseModel
+from pymongo.errors import DuplicateKeyError
 from typing import List, Optional
 import logging
 
-from models.gemini_ai import gemini_ai
-from utils.db import get_quizzes_collection, get_summaries_collection, get_users_collection
+from utils.quiz_generator import generate_quiz_questions, take_pregenerated_questions, QUIZ_PREGENERATE
+from utils.cache import LRUCache
+from utils.responses import FastJSONResponse
+from utils.pagination import paginate_history, history_projection, DEFAULT_PAGE_LIMIT, MAX_PAGE_LIMIT
+from lib.database import get_quizzes_collection, get_summaries_collection, get_users_collection
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
@@ -23,6 +28,21 @@ router = APIRouter()
 FREE_QUIZ_ATTEMPT_LIMIT = 2
 QUESTIONS_PER_PAGE = 5
 
+# Stored quizzes never change, so pages stay cached until evicted
+quiz_page_cache = LRUCache(maxsize=int(os.getenv("QUIZ_PAGE_CACHE_SIZE", "4096")))
+
+# Question count read from the stored total, falling back to a server-side
+# $size for quizzes saved before total_questions existed
+QUESTION_COUNT_EXPRESSION = {"$ifNull": ["$total_questions", {"$size": {"$ifNull": ["$questions", []]}}]}
+
+# Fields the quiz list can return
+QUIZ_LIST_FIELDS = {
+    "summary_id": 1,
+    "question_count": QUESTION_COUNT_EXPRESSION,
+    "created_at": 1
+}
+QUIZ_LIST_DEFAULT_FIELDS = ["summary_id", "question_count", "created_at"]
+
 class GenerateQuizRequest(BaseModel):
     user_id: str
     summary_id: str
@@ -39,6 +59,55 @@ class QuizPageResponse(BaseModel):
     total_pages: int
     questions: List[dict]
 
+async def reserve_quiz_attempt(user_id: str) -> bool:
+    """
+    Reserve one quiz generation for a user in a single atomic update.
+
+    Creates the user record on first use, and only increments quiz_attempts
+    while a free user is under FREE_QUIZ_ATTEMPT_LIMIT, so concurrent requests
+    cannot overshoot the limit.
+
+    Returns:
+        True if a slot was reserved, False if the free limit is reached
+    """
+    users_collection = get_users_collection()
+    query = {
+        "_id": user_id,
+        "$or": [
+            {"subscription_type": {"$ne": "free"}},
+            {"quiz_attempts": {"$exists": False}},
+            {"quiz_attempts": {"$lt": FREE_QUIZ_ATTEMPT_LIMIT}}
+        ]
+    }
+    try:
+        await users_collection.update_one(
+            query,
+            {
+                "$inc": {"quiz_attempts": 1},
+                "$setOnInsert": {
+                    "subscription_type": "free",
+                    "created_at": datetime.utcnow().isoformat()
+                }
+            },
+            upsert=True
+        )
+        return True
+    except DuplicateKeyError:
+        # Either the user is out of attempts, or a concurrent first request
+        # created the record first ($or filters are not retried by MongoDB)
+        result = await users_collection.update_one(query, {"$inc": {"quiz_attempts": 1}})
+        return result.matched_count > 0
+
+async def refund_quiz_attempt(user_id: str):
+    """Give back a reserved quiz generation after a failure."""
+    try:
+        await get_users_collection().update_one(
+            {"_id": user_id},
+            {"$inc": {"quiz_attempts": -1}}
+        )
+    except Exception as e:
+        logger.error(f"Failed to refund quiz attempt for user {user_id}: {e}")
+
 @router.post("/api/generate-quiz", response_model=GenerateQuizResponse)
 async def generate_quiz(request: GenerateQuizRequest):
     """
@@ -51,42 +120,40 @@ async def generate_quiz(request: GenerateQuizRequest):
     Returns:
         Quiz ID and pagination info
     """
+    # Check the quiz attempt limit and reserve an attempt in one round trip
     try:
-        # Check user's quiz attempt limit
-        users_collection = get_users_collection()
-        user = users_collection.find_one({"_id": request.user_id})
-
-        if not user:
-            # Create user record if doesn't exist
-            user = {
-                "_id": request.user_id,
-                "quiz_attempts": 0,
-                "subscription_type": "free",
-                "created_at": datetime.utcnow().isoformat()
-            }
-            users_collection.insert_one(user)
+        reserved = await reserve_quiz_attempt(request.user_id)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error reserving quiz attempt: {e}")
+        raise HTTPException(status_code=500, detail=f"Failed to generate quiz: {str(e)}")
 
-        # Check if free user has exceeded attempts
-        if user.get("subscription_type") == "free":
-            quiz_attempts = user.get("quiz_attempts", 0)
-            if quiz_attempts >= FREE_QUIZ_ATTEMPT_LIMIT:
-                raise HTTPException(
-                    status_code=402,
-                    detail="Upgrade to premium to generate more quizzes. Free users are limited to 2 quiz generations."
-                )
+    if not reserved:
+        raise HTTPException(
+            status_code=402,
+            detail="Upgrade to premium to generate more quizzes. Free users are limited to 2 quiz generations."
+        )
 
+    try:
         # Fetch summary
         from bson import ObjectId
         summaries_collection = get_summaries_collection()
-        summary = summaries_collection.find_one({"_id": ObjectId(request.summary_id)})
+        summary = await summaries_collection.find_one({"_id": ObjectId(request.summary_id)})
 
         if not summary:
             raise HTTPException(status_code=404, detail="Summary not found")
 
-        logger.info(f"Generating quiz for summary: {request.summary_id}")
+        # Serve a quiz pre-generated after summarization (waiting if it is still running)
+        questions = None
+        if QUIZ_PREGENERATE:
+            questions = await take_pregenerated_questions(request.summary_id)
+
+        if questions is None:
+            logger.info(f"Generating quiz for summary: {request.summary_id}")
 
-        # Generate quiz questions
-        questions = gemini_ai.generate_quiz(summary['summary'], num_questions=50)
+            # Generate quiz questions in parallel section-based sub-batches
+            questions = await generate_quiz_questions(summary['summary'], num_questions=50)
 
         if len(questions) < 50:
             logger.warning(f"Generated only {len(questions)} questions, expected 50")
@@ -101,15 +168,9 @@ async def generate_quiz(request: GenerateQuizRequest):
             "created_at": datetime.utcnow().isoformat()
         }
 
-        result = quizzes_collection.insert_one(quiz_doc)
+        result = await quizzes_collection.insert_one(quiz_doc)
         quiz_id = str(result.inserted_id)
 
-        # Increment user's quiz attempt count
-        users_collection.update_one(
-            {"_id": request.user_id},
-            {"$inc": {"quiz_attempts": 1}}
-        )
-
         total_pages = (len(questions) + QUESTIONS_PER_PAGE - 1) // QUESTIONS_PER_PAGE
 
         logger.info(f"Quiz generated with ID: {quiz_id}, {len(questions)} questions")
@@ -122,8 +183,10 @@ async def generate_quiz(request: GenerateQuizRequest):
         )
 
     except HTTPException:
+        await refund_quiz_attempt(request.user_id)
         raise
     except Exception as e:
+        await refund_quiz_attempt(request.user_id)
         logger.error(f"Error generating quiz: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to generate quiz: {str(e)}")
 
@@ -142,34 +205,51 @@ async def get_quiz_page(
     Returns:
         5 questions for the requested page
     """
+    cached_page = quiz_page_cache.get((quiz_id, page))
+    if cached_page is not None:
+        return cached_page
+
     try:
         from bson import ObjectId
         quizzes_collection = get_quizzes_collection()
 
-        quiz = quizzes_collection.find_one({"_id": ObjectId(quiz_id)})
+        # Calculate pagination indices
+        start_idx = (page - 1) * QUESTIONS_PER_PAGE
+
+        # Fetch only the requested page of questions plus the stored question count
+        quiz = await quizzes_collection.find_one(
+            {"_id": ObjectId(quiz_id)},
+            {
+                "_id": 0,
+                "questions": {"$slice": [start_idx, QUESTIONS_PER_PAGE]},
+                "total_questions": 1
+            }
+        )
 
         if not quiz:
             raise HTTPException(status_code=404, detail="Quiz not found")
 
-        questions = quiz.get('questions', [])
-        total_questions = len(questions)
+        total_questions = quiz.get('total_questions')
+        if total_questions is None:
+            # Saved before total_questions existed: count on the server
+            counted = await quizzes_collection.find_one(
+                {"_id": ObjectId(quiz_id)},
+                {"_id": 0, "question_count": QUESTION_COUNT_EXPRESSION}
+            )
+            total_questions = (counted or {}).get('question_count', 0)
         total_pages = (total_questions + QUESTIONS_PER_PAGE - 1) // QUESTIONS_PER_PAGE
 
         if page > total_pages:
             raise HTTPException(status_code=400, detail=f"Page {page} does not exist. Total pages: {total_pages}")
 
-        # Calculate pagination indices
-        start_idx = (page - 1) * QUESTIONS_PER_PAGE
-        end_idx = min(start_idx + QUESTIONS_PER_PAGE, total_questions)
-
-        page_questions = questions[start_idx:end_idx]
-
-        return QuizPageResponse(
+        page_response = QuizPageResponse(
             quiz_id=quiz_id,
             page=page,
             total_pages=total_pages,
-            questions=page_questions
+            questions=quiz.get('questions', [])
         )
+        quiz_page_cache.set((quiz_id, page), page_response)
+        return page_response
 
     except HTTPException:
         raise
@@ -178,27 +258,29 @@ async def get_quiz_page(
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/api/quizzes")
-async def get_user_quizzes(user_id: str):
-    """Get all quizzes for a user."""
+async def get_user_quizzes(
+    user_id: str,
+    limit: int = Query(DEFAULT_PAGE_LIMIT, ge=1, le=MAX_PAGE_LIMIT),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return (default: all metadata)")
+):
+    """Get a page of quiz metadata for a user, newest first (questions come from /api/quiz/{quiz_id})."""
     try:
         quizzes_collection = get_quizzes_collection()
 
-        quizzes = list(quizzes_collection.find({"user_id": user_id}).sort("created_at", -1))
+        # Question lists never leave MongoDB for the list view
+        projection = history_projection(fields, QUIZ_LIST_FIELDS, QUIZ_LIST_DEFAULT_FIELDS)
+        quizzes, next_cursor = await paginate_history(quizzes_collection, user_id, limit, cursor, projection)
 
-        # Convert ObjectIds to strings and remove full question lists
-        for quiz in quizzes:
-            quiz['_id'] = str(quiz['_id'])
-            quiz['question_count'] = len(quiz.get('questions', []))
-            # Remove full questions to reduce payload size
-            if 'questions' in quiz:
-                del quiz['questions']
-
-        return {
+        return FastJSONResponse({
             "status": "success",
             "count": len(quizzes),
-            "data": quizzes
-        }
+            "data": quizzes,
+            "next_cursor": next_cursor
+        })
 
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error fetching quizzes: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -8,20 +8,46 @@ Handles large PDFs with chunking and verbatim definition extraction.
 """
 
 import os
-import tempfile
-from datetime import datetime
-from fastapi import APIRouter, File, UploadFile, Form, HTTPException
+import asyncio
+from fastapi import APIRouter, File, UploadFile, Form, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse, JSONResponse
 from pydantic import BaseModel
-from typing import Optional
+from typing import Optional, List, Dict
 import logging
 
-from utils.pdf_processor import PDFProcessor
-from models.gemini_ai import gemini_ai
-from utils.db import get_summaries_collection
+from utils.pdf_processor import PDFPageLimitError
+from utils.responses import FastJSONResponse, dumps
+from utils.circuit_breaker import CircuitOpenError
+from utils.summary_pipeline import (
+    summarize_document,
+    summary_cache_key,
+    find_cached_summary,
+    SummarizationError
+)
+from utils.uploads import read_upload
+from utils import job_queue
+from utils.memory import MemoryTracker
+from utils.metrics import time_stage
+from utils.pagination import paginate_history, history_projection, DEFAULT_PAGE_LIMIT, MAX_PAGE_LIMIT
+from lib.database import get_summaries_collection
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
+# Idle streams send a heartbeat this often so proxies do not drop the connection
+STREAM_HEARTBEAT_SECONDS = float(os.getenv("STREAM_HEARTBEAT_SECONDS", "15"))
+
+# Fields the summary list can return; the full 'summary' body only on request
+SUMMARY_LIST_FIELDS = {
+    "file_name": 1,
+    "title": "$summary.title",
+    "pages": 1,
+    "total_words": 1,
+    "created_at": 1,
+    "summary": 1
+}
+SUMMARY_LIST_DEFAULT_FIELDS = ["file_name", "title", "pages", "total_words", "created_at"]
+
 class SummarizeResponse(BaseModel):
     summary_id: str
     file_name: str
@@ -29,11 +55,43 @@ class SummarizeResponse(BaseModel):
     total_words: int
     summary: dict
     created_at: str
+    chunk_timings: List[dict] = []
+    cached: bool = False
+    memory: Optional[dict] = None
 
-@router.post("/api/summarize-pdf", response_model=SummarizeResponse)
+def _validate_pdf_upload(file: UploadFile):
+    """Reject non-PDF uploads."""
+    if not file.filename.endswith('.pdf'):
+        raise HTTPException(status_code=400, detail="Only PDF files are supported")
+
+def _cached_summary_response(summary: Dict[str, any]) -> Dict[str, any]:
+    """Response fields for a summary served from the content-addressed cache."""
+    return {
+        "summary_id": str(summary['_id']),
+        "file_name": summary['file_name'],
+        "pages": summary['pages'],
+        "total_words": summary['total_words'],
+        "summary": summary['summary'],
+        "created_at": summary['created_at'],
+        "chunk_timings": [],
+        "cached": True,
+        "memory": None
+    }
+
+class SummaryJobResponse(BaseModel):
+    job_id: str
+    status: str
+    status_url: str
+
+@router.post(
+    "/api/summarize-pdf",
+    response_model=SummarizeResponse,
+    responses={202: {"model": SummaryJobResponse}}
+)
 async def summarize_pdf(
     file: UploadFile = File(...),
-    user_id: str = Form(...)
+    user_id: str = Form(...),
+    async_mode: bool = Form(False)
 ):
     """
     Summarize a PDF file with context-preserved chunking.
@@ -41,87 +99,200 @@ async def summarize_pdf(
     Args:
         file: PDF file upload
         user_id: User ID for tracking
+        async_mode: Queue the work and return a job ID (202) instead of waiting
 
     Returns:
-        Summary with verbatim definitions, bullets, and question-style prompts
+        Summary with verbatim definitions, bullets, and question-style prompts,
+        or the queued job when async_mode is set
     """
-    if not file.filename.endswith('.pdf'):
-        raise HTTPException(status_code=400, detail="Only PDF files are supported")
-
-    temp_path = None
+    _validate_pdf_upload(file)
 
     try:
-        # Save uploaded file temporarily
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as tmp:
-            content = await file.read()
-            tmp.write(content)
-            temp_path = tmp.name
+        # Stream the upload into a single buffer, hashing each block as it arrives
+        memory_tracker = MemoryTracker()
+        with time_stage("upload"):
+            content, content_digest = await read_upload(file)
+
+        # Identical uploads reuse the stored summary instead of re-running extraction and the LLM
+        content_hash = summary_cache_key(content_digest)
+        cached_summary = await find_cached_summary(content_hash, user_id, file.filename)
+
+        if async_mode:
+            if cached_summary:
+                cached_result = _cached_summary_response(cached_summary)
+                del cached_result['summary']
+                job_id = await job_queue.record_completed_job(cached_result, user_id)
+                job_status = job_queue.COMPLETED
+            else:
+                job_id = await job_queue.enqueue_summary_job(content, content_hash, file.filename, user_id)
+                job_status = job_queue.QUEUED
+
+            return JSONResponse(
+                status_code=202,
+                content={
+                    "job_id": job_id,
+                    "status": job_status,
+                    "status_url": f"/api/summarize-jobs/{job_id}"
+                }
+            )
+
+        if cached_summary:
+            logger.info(f"Summary cache hit for {file.filename} (user: {user_id})")
+            return FastJSONResponse(_cached_summary_response(cached_summary))
+
+        logger.info(f"Processing PDF: {file.filename} ({len(content)} bytes) for user: {user_id}")
+
+        result = await summarize_document(
+            content,
+            content_hash,
+            file.filename,
+            user_id,
+            memory_tracker=memory_tracker
+        )
+        # Returned as-is: the large summary body skips a second pass through response validation
+        return FastJSONResponse({**result, "cached": False})
 
-        logger.info(f"Processing PDF: {file.filename} for user: {user_id}")
+    except HTTPException:
+        raise
+    except PDFPageLimitError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except SummarizationError as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error processing PDF: {e}")
+        raise HTTPException(status_code=500, detail=f"Failed to process PDF: {str(e)}")
 
-        # Process PDF: extract and chunk
-        pdf_processor = PDFProcessor(chunk_size=2000, overlap=200)
-        pdf_data = pdf_processor.process_pdf(temp_path)
+@router.get("/api/summarize-jobs/{job_id}")
+async def get_summary_job(job_id: str):
+    """
+    Get the status of a queued summarization job.
 
-        logger.info(f"PDF processed: {pdf_data['pages']} pages, {len(pdf_data['chunks'])} chunks")
+    Returns:
+        Job status and progress; completed jobs include 'result' with the
+        summary_id (fetch the summary itself from /api/summaries/{summary_id})
+    """
+    try:
+        job = await job_queue.get_job(job_id)
+
+        if not job:
+            raise HTTPException(status_code=404, detail="Summary job not found")
+
+        response = {
+            "job_id": str(job['_id']),
+            "status": job['status'],
+            "file_name": job['file_name'],
+            "attempts": job.get('attempts', 0),
+            "progress": job.get('progress', {}),
+            "created_at": job['created_at'].isoformat(),
+            "updated_at": job['updated_at'].isoformat()
+        }
+        if job['status'] == job_queue.COMPLETED:
+            response['result'] = job.get('result')
+        if job.get('error'):
+            response['error'] = job['error']
+        return response
 
-        # Summarize each chunk
-        chunk_summaries = []
-        for chunk in pdf_data['chunks']:
-            try:
-                chunk_summary = gemini_ai.summarize_chunk(
-                    chunk['text'],
-                    chunk.get('page_hint')
-                )
-                chunk_summaries.append(chunk_summary)
-                logger.info(f"Summarized chunk {chunk['chunk_index'] + 1}/{len(pdf_data['chunks'])}")
-            except Exception as e:
-                logger.error(f"Error summarizing chunk {chunk['chunk_index']}: {e}")
-                # Continue with other chunks
-                continue
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error fetching summary job: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
 
-        if not chunk_summaries:
-            raise HTTPException(status_code=500, detail="Failed to summarize any chunks")
+def _format_event(event_type: str, payload: Dict[str, any], sse: bool) -> str:
+    """Encode one stream event as an SSE frame or an NDJSON line."""
+    if sse:
+        return f"event: {event_type}\ndata: {dumps(payload)}\n\n"
+    return dumps({"event": event_type, **payload}) + "\n"
 
-        # Merge chunk summaries
-        logger.info("Merging chunk summaries...")
-        final_summary = gemini_ai.merge_chunk_summaries(chunk_summaries)
+@router.post("/api/summarize-pdf/stream")
+async def summarize_pdf_stream(
+    request: Request,
+    file: UploadFile = File(...),
+    user_id: str = Form(...)
+):
+    """
+    Summarize a PDF and stream progress as it happens.
 
-        # Store in database
-        summaries_collection = get_summaries_collection()
-        summary_doc = {
-            "user_id": user_id,
-            "file_name": file.filename,
-            "pages": pdf_data['pages'],
-            "total_words": pdf_data['total_words'],
-            "summary": final_summary,
-            "created_at": datetime.utcnow().isoformat()
-        }
+    Emits NDJSON lines (or Server-Sent Events when the client accepts
+    text/event-stream): a 'progress' event after extraction with page and
+    chunk counts, one 'chunk' event per chunk summary as soon as it is ready,
+    then a final 'summary' event with the merged summary and summary_id
+    (or an 'error' event). Heartbeats keep idle connections alive.
 
-        result = summaries_collection.insert_one(summary_doc)
-        summary_id = str(result.inserted_id)
+    Args:
+        file: PDF file upload
+        user_id: User ID for tracking
+    """
+    _validate_pdf_upload(file)
 
-        logger.info(f"Summary saved with ID: {summary_id}")
+    memory_tracker = MemoryTracker()
+    with time_stage("upload"):
+        content, content_digest = await read_upload(file)
+    content_hash = summary_cache_key(content_digest)
+    cached_summary = await find_cached_summary(content_hash, user_id, file.filename)
 
-        return SummarizeResponse(
-            summary_id=summary_id,
-            file_name=file.filename,
-            pages=pdf_data['pages'],
-            total_words=pdf_data['total_words'],
-            summary=final_summary,
-            created_at=summary_doc['created_at']
-        )
+    sse = "text/event-stream" in request.headers.get("accept", "")
+    file_name = file.filename
 
-    except HTTPException:
-        raise
-    except Exception as e:
-        logger.error(f"Error processing PDF: {e}")
-        raise HTTPException(status_code=500, detail=f"Failed to process PDF: {str(e)}")
+    async def event_stream():
+        if cached_summary:
+            logger.info(f"Summary cache hit for {file_name} (user: {user_id})")
+            yield _format_event("summary", _cached_summary_response(cached_summary), sse)
+            return
+
+        queue: asyncio.Queue = asyncio.Queue()
+
+        async def on_event(event_type: str, payload: Dict[str, any]):
+            await queue.put((event_type, payload))
 
-    finally:
-        # Clean up temporary file
-        if temp_path and os.path.exists(temp_path):
-            os.unlink(temp_path)
+        async def run():
+            try:
+                result = await summarize_document(
+                    content,
+                    content_hash,
+                    file_name,
+                    user_id,
+                    on_event=on_event,
+                    memory_tracker=memory_tracker
+                )
+                await queue.put(("summary", {**result, "cached": False}))
+            except CircuitOpenError as e:
+                await queue.put(("error", {"status_code": 503, "detail": e.detail, "retry_after": e.retry_after}))
+            except PDFPageLimitError as e:
+                await queue.put(("error", {"status_code": 413, "detail": str(e)}))
+            except SummarizationError as e:
+                await queue.put(("error", {"status_code": 500, "detail": str(e)}))
+            except Exception as e:
+                logger.error(f"Error processing PDF: {e}")
+                await queue.put(("error", {"status_code": 500, "detail": f"Failed to process PDF: {str(e)}"}))
+            finally:
+                await queue.put(None)
+
+        logger.info(f"Streaming summary for PDF: {file_name} for user: {user_id}")
+        task = asyncio.create_task(run())
+
+        try:
+            while True:
+                try:
+                    item = await asyncio.wait_for(queue.get(), timeout=STREAM_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": heartbeat\n\n" if sse else _format_event("heartbeat", {}, sse)
+                    continue
+
+                if item is None:
+                    break
+                yield _format_event(*item, sse)
+        finally:
+            # Client went away: stop paying for LLM calls nobody will read
+            # (finished chunks stay in the chunk cache for a retry)
+            if not task.done():
+                task.cancel()
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream" if sse else "application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 @router.get("/api/summaries/{summary_id}")
 async def get_summary(summary_id: str):
@@ -130,37 +301,42 @@ async def get_summary(summary_id: str):
         from bson import ObjectId
         summaries_collection = get_summaries_collection()
 
-        summary = summaries_collection.find_one({"_id": ObjectId(summary_id)})
+        summary = await summaries_collection.find_one({"_id": ObjectId(summary_id)})
 
         if not summary:
             raise HTTPException(status_code=404, detail="Summary not found")
 
-        # Convert ObjectId to string
-        summary['_id'] = str(summary['_id'])
-        return summary
+        return FastJSONResponse(summary)
 
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error fetching summary: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/api/summaries")
-async def get_user_summaries(user_id: str):
-    """Get all summaries for a user."""
+async def get_user_summaries(
+    user_id: str,
+    limit: int = Query(DEFAULT_PAGE_LIMIT, ge=1, le=MAX_PAGE_LIMIT),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return (default: metadata only)")
+):
+    """Get a page of summary metadata for a user, newest first."""
     try:
         summaries_collection = get_summaries_collection()
 
-        summaries = list(summaries_collection.find({"user_id": user_id}).sort("created_at", -1))
-
-        # Convert ObjectIds to strings
-        for summary in summaries:
-            summary['_id'] = str(summary['_id'])
+        projection = history_projection(fields, SUMMARY_LIST_FIELDS, SUMMARY_LIST_DEFAULT_FIELDS)
+        summaries, next_cursor = await paginate_history(summaries_collection, user_id, limit, cursor, projection)
 
-        return {
+        return FastJSONResponse({
             "status": "success",
             "count": len(summaries),
-            "data": summaries
-        }
+            "data": summaries,
+            "next_cursor": next_cursor
+        })
 
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error fetching summaries: {e}")
         raise HTTPException(status_code=500, detail=str(e))
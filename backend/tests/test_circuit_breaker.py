@@ -0,0 +1,136 @@
+# ===========================================
+# FONTA AI STUDY COMPANION - CIRCUIT BREAKER TESTS
+# ===========================================
+
+"""
+Tests for CircuitBreaker state transitions and half-open admission.
+"""
+
+import pytest
+
+pytest.importorskip("fastapi")
+
+from utils import circuit_breaker
+from utils.circuit_breaker import CircuitBreaker, CircuitOpenError, CLOSED, OPEN, HALF_OPEN
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(circuit_breaker.time, "monotonic", fake)
+    return fake
+
+def open_breaker(**overrides) -> CircuitBreaker:
+    settings = {"error_threshold": 0.5, "min_calls": 4, "window_seconds": 30, "open_seconds": 10, "max_open_seconds": 40}
+    breaker = CircuitBreaker("test", **{**settings, **overrides})
+    for _ in range(4):
+        breaker.record_failure()
+    return breaker
+
+def test_stays_closed_below_min_calls_or_threshold(clock):
+    breaker = CircuitBreaker("test", error_threshold=0.5, min_calls=4)
+    for _ in range(3):
+        breaker.record_failure()
+    assert breaker.state == CLOSED
+
+    breaker = CircuitBreaker("test", error_threshold=0.5, min_calls=4)
+    for _ in range(3):
+        breaker.record_success()
+    breaker.record_failure()
+    assert breaker.state == CLOSED
+
+def test_opens_and_fails_fast_with_retry_after(clock):
+    breaker = open_breaker()
+    assert breaker.state == OPEN
+
+    clock.now += 4
+    with pytest.raises(CircuitOpenError) as error:
+        breaker.before_call()
+    assert error.value.status_code == 503
+    assert error.value.retry_after == 6
+    assert error.value.headers["Retry-After"] == "6"
+    assert breaker.stats()["rejected"] == 1
+
+def test_old_outcomes_leave_the_window(clock):
+    breaker = CircuitBreaker("test", error_threshold=0.5, min_calls=4, window_seconds=30)
+    for _ in range(3):
+        breaker.record_failure()
+    clock.now += 31
+    for _ in range(3):
+        breaker.record_success()
+    breaker.record_failure()
+    assert breaker.state == CLOSED
+
+def test_half_open_after_cooldown_then_closes_on_successes(clock, monkeypatch):
+    breaker = open_breaker()
+    clock.now += 10
+    monkeypatch.setattr(circuit_breaker.random, "random", lambda: 0.0)
+
+    breaker.before_call()
+    assert breaker.state == HALF_OPEN
+    assert breaker.stats()["admit_fraction"] == circuit_breaker.HALF_OPEN_START_FRACTION
+
+    # The admitted fraction doubles per success until all traffic is let through
+    for _ in range(4):
+        breaker.record_success()
+    assert breaker.state == CLOSED
+    breaker.before_call()
+
+def test_half_open_samples_traffic(clock, monkeypatch):
+    breaker = open_breaker()
+    clock.now += 10
+    monkeypatch.setattr(circuit_breaker.random, "random", lambda: 0.5)
+
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+    assert breaker.state == HALF_OPEN
+
+def test_failure_while_half_open_reopens_with_longer_cooldown(clock, monkeypatch):
+    breaker = open_breaker()
+    clock.now += 10
+    monkeypatch.setattr(circuit_breaker.random, "random", lambda: 0.0)
+    breaker.before_call()
+
+    breaker.record_failure()
+    assert breaker.state == OPEN
+    assert breaker.stats()["retry_after_seconds"] == 20
+
+def test_probe_success_after_cooldown_recovers_without_traffic(clock):
+    breaker = open_breaker()
+
+    # Before the cool-down a success does not start recovery
+    breaker.record_success()
+    assert breaker.state == OPEN
+
+    clock.now += 10
+    breaker.record_success()
+    assert breaker.state == HALF_OPEN
+    for _ in range(3):
+        breaker.record_success()
+    assert breaker.state == CLOSED
+
+def test_admission_lets_a_whole_document_through_half_open(clock, monkeypatch):
+    breaker = open_breaker()
+    clock.now += 10
+    samples = iter([0.0])
+    monkeypatch.setattr(circuit_breaker.random, "random", lambda: next(samples, 0.99))
+
+    with breaker.admission():
+        # Sampled once on entry; the document's many calls are not sampled again
+        for _ in range(20):
+            breaker.before_call()
+
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+def test_admission_still_rejects_when_open(clock):
+    breaker = open_breaker()
+    with pytest.raises(CircuitOpenError):
+        with breaker.admission():
+            pass
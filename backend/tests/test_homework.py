@@ -0,0 +1,49 @@
+# ===========================================
+# FONTA AI STUDY COMPANION - HOMEWORK CACHE KEY TESTS
+# ===========================================
+
+"""
+Tests for question normalization and homework cache keys.
+"""
+
+import pytest
+
+pytest.importorskip("fastapi")
+pytest.importorskip("motor")
+
+from routes.homework import normalize_question_text, homework_cache_key
+
+@pytest.mark.parametrize("question, expected", [
+    ("  What   is  Osmosis? ", "what is osmosis"),
+    ("What is osmosis?!", "what is osmosis"),
+    ("Define “osmosis”.", "define osmosis"),
+    ("Is 3.5 bigger than 3.25?", "is 3.5 bigger than 3.25"),
+    ("Simplify 1:2, then 2:4.", "simplify 1:2, then 2:4"),
+    ("Find y' if y = x^2", "find y' if y = x^2"),
+    ("How many ways: 10!", "how many ways: 10!"),
+    ("Expand (x+1)!", "expand (x+1)!"),
+    ("ＦＵＬＬＷＩＤＴＨ question", "fullwidth question"),
+])
+def test_normalize_question_text(question, expected):
+    assert normalize_question_text(question) == expected
+
+def test_normalize_empty():
+    assert normalize_question_text(None) == ""
+    assert normalize_question_text("") == ""
+
+def test_equivalent_wordings_share_a_key():
+    assert homework_cache_key("What is osmosis?", "Biology", None) == \
+        homework_cache_key("what  is OSMOSIS", "biology", None)
+
+@pytest.mark.parametrize("first, second", [
+    ("Find y' if y = x^2", "Find y if y = x^2"),
+    ("How many ways: 10!", "How many ways: 10"),
+    ("What is 3.5?", "What is 35?"),
+])
+def test_different_math_gets_different_keys(first, second):
+    assert homework_cache_key(first, None, None) != homework_cache_key(second, None, None)
+
+def test_topic_and_difficulty_are_part_of_the_key():
+    base = homework_cache_key("Solve x + 2 = 4", "Algebra", "easy")
+    assert base != homework_cache_key("Solve x + 2 = 4", "Algebra", "hard")
+    assert base != homework_cache_key("Solve x + 2 = 4", "Geometry", "easy")
@@ -0,0 +1,117 @@
+# ===========================================
+# FONTA AI STUDY COMPANION - LLM SCHEDULER TESTS
+# ===========================================
+
+"""
+Tests for LLMScheduler priority ordering and adaptive backoff.
+"""
+
+import asyncio
+
+import pytest
+
+from utils.llm_scheduler import LLMScheduler, Priority, is_overload_error
+
+class Overloaded(Exception):
+    code = 429
+
+def test_higher_priority_waiters_are_served_first():
+    async def scenario():
+        scheduler = LLMScheduler(max_concurrency=1, rate_per_second=1000, burst=100)
+        release = asyncio.Event()
+        order = []
+
+        async def hold():
+            await release.wait()
+
+        def record(name):
+            async def call():
+                order.append(name)
+            return call
+
+        holder = asyncio.create_task(scheduler.run(Priority.INTERACTIVE, hold))
+        await asyncio.sleep(0)
+
+        # Queued while the only slot is taken, lowest priority first
+        waiters = [
+            asyncio.create_task(scheduler.run(Priority.BULK, record("bulk"))),
+            asyncio.create_task(scheduler.run(Priority.STANDARD, record("standard"))),
+            asyncio.create_task(scheduler.run(Priority.INTERACTIVE, record("interactive")))
+        ]
+        await asyncio.sleep(0)
+        assert scheduler.stats()["queue_depth"] == 3
+
+        release.set()
+        await asyncio.gather(holder, *waiters)
+        return order
+
+    assert asyncio.run(scenario()) == ["interactive", "standard", "bulk"]
+
+def test_same_priority_is_first_in_first_out():
+    async def scenario():
+        scheduler = LLMScheduler(max_concurrency=1, rate_per_second=1000, burst=100)
+        order = []
+
+        def record(index):
+            async def call():
+                order.append(index)
+            return call
+
+        await asyncio.gather(*(scheduler.run(Priority.BULK, record(index)) for index in range(5)))
+        return order
+
+    assert asyncio.run(scenario()) == list(range(5))
+
+def test_overload_pauses_and_halves_the_rate_then_recovers():
+    async def scenario():
+        scheduler = LLMScheduler(max_concurrency=4, rate_per_second=10, burst=10)
+
+        async def fail():
+            raise Overloaded("throttled")
+
+        with pytest.raises(Overloaded):
+            await scheduler.run(Priority.BULK, fail)
+
+        throttled = scheduler.stats()
+        assert throttled["throttled"] == 1
+        assert throttled["rate_per_second"] == 5.0
+        assert throttled["backoff_seconds"] > 0
+        assert scheduler.available_slots() == 0
+
+        # Additive increase after a success once the pause is over
+        scheduler._backoff_until = 0.0
+
+        async def succeed():
+            return "ok"
+
+        assert await scheduler.run(Priority.BULK, succeed) == "ok"
+        assert scheduler.stats()["rate_per_second"] == 5.5
+
+    asyncio.run(scenario())
+
+def test_other_errors_do_not_trigger_backoff():
+    async def scenario():
+        scheduler = LLMScheduler(max_concurrency=4, rate_per_second=10, burst=10)
+
+        async def fail():
+            raise ValueError("unparseable model output")
+
+        with pytest.raises(ValueError):
+            await scheduler.run(Priority.BULK, fail)
+        return scheduler.stats()
+
+    stats = asyncio.run(scenario())
+    assert stats["throttled"] == 0
+    assert stats["rate_per_second"] == 10.0
+
+def test_is_overload_error_classification():
+    class ServiceUnavailable(Exception):
+        pass
+
+    class BadRequest(Exception):
+        code = 400
+
+    assert is_overload_error(Overloaded())
+    assert is_overload_error(ServiceUnavailable())
+    assert not is_overload_error(BadRequest())
+    assert not is_overload_error(ValueError())
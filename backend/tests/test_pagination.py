@@ -0,0 +1,44 @@
+# ===========================================
+# FONTA AI STUDY COMPANION - PAGINATION TESTS
+# ===========================================
+
+"""
+Tests for keyset cursor encoding and decoding.
+"""
+
+import base64
+
+import pytest
+
+pytest.importorskip("bson")
+pytest.importorskip("fastapi")
+
+from bson import ObjectId
+from fastapi import HTTPException
+
+from utils.pagination import encode_cursor, decode_cursor
+
+def test_cursor_round_trip():
+    doc_id = ObjectId()
+    cursor = encode_cursor({"created_at": "2024-05-01T10:00:00.123456", "_id": doc_id, "title": "ignored"})
+
+    assert decode_cursor(cursor) == ("2024-05-01T10:00:00.123456", doc_id)
+
+def test_cursor_is_url_safe_without_padding():
+    cursor = encode_cursor({"created_at": "2024-05-01T10:00:00", "_id": ObjectId()})
+
+    assert "=" not in cursor
+    assert set(cursor) <= set("ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789-_")
+
+@pytest.mark.parametrize("cursor", [
+    "not-a-cursor",
+    base64.urlsafe_b64encode(b"{}").decode(),
+    base64.urlsafe_b64encode(b'["2024-05-01", "not-an-object-id"]').decode(),
+    base64.urlsafe_b64encode(b'["only-one-value"]').decode(),
+])
+def test_malformed_cursor_is_a_400(cursor):
+    with pytest.raises(HTTPException) as error:
+        decode_cursor(cursor)
+
+    assert error.value.status_code == 400
+    assert error.value.detail == "Invalid cursor"
@@ -0,0 +1,63 @@
+# ===========================================
+# FONTA AI STUDY COMPANION - PDF PROCESSOR TESTS
+# ===========================================
+
+"""
+Tests for the sentence-aware chunker: page labels and overlap.
+"""
+
+from utils.pdf_processor import PDFProcessor
+
+def words(prefix: str, count: int) -> str:
+    return " ".join(f"{prefix}{i}" for i in range(count))
+
+def chunk_pages(pages, chunk_size=10, overlap=3):
+    processor = PDFProcessor(chunk_size=chunk_size, overlap=overlap)
+    return processor.chunk_text("", [{"page": page, "text": text} for page, text in pages])
+
+def test_single_page_chunk_is_labelled_with_its_page():
+    chunks = chunk_pages([(1, words("a", 5) + ".")])
+
+    assert len(chunks) == 1
+    assert chunks[0]["start_page"] == chunks[0]["end_page"] == 1
+    assert chunks[0]["page_hint"] == "p. 1"
+
+def test_sentence_continuing_on_next_page_spans_both_pages():
+    chunks = chunk_pages([(1, words("a", 3)), (2, words("b", 3) + ".")])
+
+    assert len(chunks) == 1
+    assert chunks[0]["text"] == words("a", 3) + " " + words("b", 3) + "."
+    assert chunks[0]["page_hint"] == "pp. 1-2"
+
+def test_fragment_too_long_to_join_keeps_its_own_end_page():
+    # The unterminated page-1 fragment cannot be joined with the page-2
+    # sentence, so it is emitted alone and must not claim page 2
+    chunks = chunk_pages([(1, words("a", 6)), (2, words("b", 6) + ".")])
+
+    assert chunks[0]["text"] == words("a", 6)
+    assert (chunks[0]["start_page"], chunks[0]["end_page"]) == (1, 1)
+    assert chunks[0]["page_hint"] == "p. 1"
+    assert chunks[-1]["end_page"] == 2
+
+def test_trailing_fragment_on_last_page_ends_on_that_page():
+    chunks = chunk_pages([(1, words("a", 4) + "."), (2, words("b", 3))])
+
+    assert chunks[-1]["end_page"] == 2
+    assert all(chunk["start_page"] <= chunk["end_page"] for chunk in chunks)
+
+def test_overlap_carries_whole_trailing_sentences():
+    text = " ".join(f"{words(prefix, 3)}." for prefix in "abcdefgh")
+    chunks = chunk_pages([(1, text)], chunk_size=10, overlap=3)
+
+    assert len(chunks) > 1
+    for previous, current in zip(chunks, chunks[1:]):
+        tail = previous["text"].split(". ")[-1]
+        # The next chunk starts with the last whole sentence (3 words <= overlap)
+        assert current["text"].startswith(tail.rstrip("."))
+
+def test_chunks_never_exceed_chunk_size():
+    text = " ".join(f"{words(prefix, 4)}." for prefix in "abcdefghij")
+    chunks = chunk_pages([(1, text), (2, words("z", 25) + ".")], chunk_size=10, overlap=3)
+
+    assert all(chunk["word_count"] <= 10 for chunk in chunks)
+    assert [chunk["chunk_index"] for chunk in chunks] == list(range(len(chunks)))
@@ -0,0 +1,84 @@
+# ===========================================
+# FONTA AI STUDY COMPANION - TREE MERGE TESTS
+# ===========================================
+
+"""
+Tests for the hierarchical chunk-summary merge: order, levels and failures.
+"""
+
+import asyncio
+
+import pytest
+
+pytest.importorskip("fastapi")
+pytest.importorskip("motor")
+
+from utils import summary_pipeline
+from utils.summary_pipeline import tree_merge
+
+@pytest.fixture
+def merges(monkeypatch):
+    """Replace the Gemini merge with one concatenating its inputs in order."""
+    calls = []
+
+    async def merge_chunk_summaries(summaries):
+        calls.append(len(summaries))
+        await asyncio.sleep(0)
+        return {"parts": [part for summary in summaries for part in summary["parts"]]}
+
+    monkeypatch.setattr(summary_pipeline.llm, "merge_chunk_summaries", merge_chunk_summaries)
+    return calls
+
+def leaf(index: int):
+    return {"parts": [index]}
+
+def run_merge(leaves, **kwargs):
+    async def scenario():
+        return await tree_merge(leaves(), **kwargs)
+    return asyncio.run(scenario())
+
+def test_merges_keep_chunk_order_when_leaves_finish_out_of_order(merges):
+    def leaves():
+        loop = asyncio.get_running_loop()
+        futures = [loop.create_future() for _ in range(20)]
+        # Resolve in reverse order, staggered across loop iterations
+        for delay, index in enumerate(reversed(range(20))):
+            loop.call_later(delay * 0.001, futures[index].set_result, leaf(index))
+        return futures
+
+    result = run_merge(leaves, fan_in=4, max_depth=3)
+
+    assert result == {"parts": list(range(20))}
+
+def test_levels_group_by_fan_in(merges):
+    def leaves():
+        return [asyncio.sleep(0, result=leaf(index)) for index in range(16)]
+
+    run_merge(leaves, fan_in=4, max_depth=3)
+
+    # 16 leaves -> 4 merges of 4 -> 1 final merge of 4
+    assert sorted(merges) == [4, 4, 4, 4, 4]
+
+def test_max_depth_forces_a_final_merge_of_everything_left(merges):
+    def leaves():
+        return [asyncio.sleep(0, result=leaf(index)) for index in range(16)]
+
+    result = run_merge(leaves, fan_in=2, max_depth=2)
+
+    assert result == {"parts": list(range(16))}
+    assert sorted(merges) == [2] * 8 + [8]
+
+def test_failed_chunks_are_skipped(merges):
+    def leaves():
+        return [asyncio.sleep(0, result=None if index % 3 == 0 else leaf(index)) for index in range(9)]
+
+    result = run_merge(leaves, fan_in=3, max_depth=3)
+
+    assert result == {"parts": [1, 2, 4, 5, 7, 8]}
+
+def test_no_successful_chunks_gives_none(merges):
+    def leaves():
+        return [asyncio.sleep(0, result=None) for _ in range(5)]
+
+    assert run_merge(leaves, fan_in=2) is None
+    assert merges == []
@@ -0,0 +1,144 @@
+# ===========================================
+# FONTA AI STUDY COMPANION - CACHING UTILITIES
+# ===========================================
+
+"""
+In-process LRU cache and a two-tier (LRU + MongoDB) cache for LLM output.
+"""
+
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional, Hashable
+import logging
+
+from lib.database import database
+
+logger = logging.getLogger(__name__)
+
+class LRUCache:
+    """Bounded in-process LRU cache with optional per-entry TTL."""
+
+    def __init__(self, maxsize: int = 1024, ttl: Optional[float] = None):
+        """
+        Initialize LRU cache.
+
+        Args:
+            maxsize: Maximum number of entries before least recently used ones are evicted
+            ttl: Optional time-to-live in seconds (None keeps entries until evicted)
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Return the cached value or None."""
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        value, expires_at = entry
+        if expires_at is not None and expires_at < time.monotonic():
+            del self._entries[key]
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: Any):
+        """Store a value, evicting the least recently used entry when full."""
+        expires_at = time.monotonic() + self.ttl if self.ttl else None
+        self._entries[key] = (value, expires_at)
+        self._entries.move_to_end(key)
+
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def pop(self, key: Hashable):
+        """Remove an entry if present."""
+        self._entries.pop(key, None)
+
+    def clear(self):
+        """Remove all entries."""
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, int]:
+        """Hit/miss counters and current size."""
+        return {"hits": self.hits, "misses": self.misses, "size": len(self._entries)}
+
+class TieredCache:
+    """
+    LRU cache in front of a MongoDB collection.
+
+    Documents are stored as {_id: key, value, created_at, expires_at}; the
+    collection needs a TTL index on 'expires_at' (see Database.ensure_indexes).
+    """
+
+    def __init__(self, collection_name: str, maxsize: int = 1024, ttl: float = 30 * 24 * 3600):
+        """
+        Initialize tiered cache.
+
+        Args:
+            collection_name: MongoDB collection backing the cache
+            maxsize: Entries kept in the in-process LRU tier
+            ttl: Time-to-live in seconds for both tiers
+        """
+        self.collection_name = collection_name
+        self.ttl = ttl
+        self.local = LRUCache(maxsize=maxsize, ttl=ttl)
+        self.hits = 0
+        self.misses = 0
+
+    async def get(self, key: str) -> Optional[Any]:
+        """Return the cached value from the LRU or MongoDB tier, or None."""
+        value = self.local.get(key)
+        if value is not None:
+            self.hits += 1
+            return value
+
+        try:
+            doc = await database.get_collection(self.collection_name).find_one(
+                {"_id": key, "expires_at": {"$gt": datetime.utcnow()}}
+            )
+        except Exception as e:
+            # A cache outage must never fail the request
+            logger.warning(f"Cache lookup failed ({self.collection_name}): {e}")
+            doc = None
+
+        if doc is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self.local.set(key, doc["value"])
+        return doc["value"]
+
+    async def set(self, key: str, value: Any):
+        """Store a value in both tiers."""
+        self.local.set(key, value)
+
+        now = datetime.utcnow()
+        try:
+            await database.get_collection(self.collection_name).replace_one(
+                {"_id": key},
+                {
+                    "value": value,
+                    "created_at": now,
+                    "expires_at": now + timedelta(seconds=self.ttl)
+                },
+                upsert=True
+            )
+        except Exception as e:
+            logger.warning(f"Cache write failed ({self.collection_name}): {e}")
+
+    def stats(self) -> Dict[str, int]:
+        """Overall hit/miss counters plus LRU tier size."""
+        return {"hits": self.hits, "misses": self.misses, "local_size": len(self.local)}
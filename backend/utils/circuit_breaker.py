@@ -0,0 +1,207 @@
+# ===========================================
+# FONTA AI STUDY COMPANION - CIRCUIT BREAKERS
+# ===========================================
+
+"""
+Circuit breakers for MongoDB and Gemini.
+A breaker opens once the error rate over a rolling window crosses a
+threshold, and calls fail fast with a 503 and Retry-After instead of
+waiting on a degraded dependency. After a cool-down it goes half-open and
+admits a growing fraction of traffic, closing again once calls succeed.
+"""
+
+import os
+import math
+import time
+import random
+import threading
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Deque, Dict, FrozenSet, Iterator, Optional, Tuple
+import logging
+
+from fastapi import HTTPException
+
+logger = logging.getLogger(__name__)
+
+# Breaker defaults
+CIRCUIT_ERROR_THRESHOLD = float(os.getenv("CIRCUIT_ERROR_THRESHOLD", "0.5"))
+CIRCUIT_MIN_CALLS = int(os.getenv("CIRCUIT_MIN_CALLS", "10"))
+CIRCUIT_WINDOW_SECONDS = float(os.getenv("CIRCUIT_WINDOW_SECONDS", "30"))
+CIRCUIT_OPEN_SECONDS = float(os.getenv("CIRCUIT_OPEN_SECONDS", "15"))
+CIRCUIT_MAX_OPEN_SECONDS = float(os.getenv("CIRCUIT_MAX_OPEN_SECONDS", "120"))
+
+# Half-open recovery: admitted fraction of traffic starts here and doubles per success
+HALF_OPEN_START_FRACTION = 0.1
+
+# Breakers that already admitted the request or document running in this context
+_admitted: ContextVar[FrozenSet[str]] = ContextVar("circuit_admitted", default=frozenset())
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+class CircuitOpenError(HTTPException):
+    """Raised instead of calling a dependency whose breaker is open (503 with Retry-After)."""
+
+    def __init__(self, name: str, retry_after: float):
+        self.retry_after = max(1, math.ceil(retry_after))
+        super().__init__(
+            status_code=503,
+            detail=f"{name} is temporarily unavailable, please retry in {self.retry_after} seconds",
+            headers={"Retry-After": str(self.retry_after)}
+        )
+
+class CircuitBreaker:
+    """Error-rate circuit breaker with gradual half-open recovery (thread-safe)."""
+
+    def __init__(
+        self,
+        name: str,
+        error_threshold: float = CIRCUIT_ERROR_THRESHOLD,
+        min_calls: int = CIRCUIT_MIN_CALLS,
+        window_seconds: float = CIRCUIT_WINDOW_SECONDS,
+        open_seconds: float = CIRCUIT_OPEN_SECONDS,
+        max_open_seconds: float = CIRCUIT_MAX_OPEN_SECONDS
+    ):
+        """
+        Initialize breaker.
+
+        Args:
+            name: Dependency name used in errors and stats
+            error_threshold: Failure fraction over the window that opens the breaker
+            min_calls: Calls needed in the window before the rate is trusted
+            window_seconds: Rolling window for the error rate
+            open_seconds: Initial cool-down before going half-open
+            max_open_seconds: Cool-down cap (it doubles each time recovery fails)
+        """
+        self.name = name
+        self.error_threshold = error_threshold
+        self.min_calls = min_calls
+        self.window_seconds = window_seconds
+        self.open_seconds = open_seconds
+        self.max_open_seconds = max_open_seconds
+
+        self.state = CLOSED
+        self.rejected = 0
+        self.opened = 0
+        self._outcomes: Deque[Tuple[float, bool]] = deque()
+        self._cooldown = open_seconds
+        self._open_until = 0.0
+        self._admit_fraction = 1.0
+        self._lock = threading.Lock()
+
+    def before_call(self):
+        """Raise CircuitOpenError if the call should not reach the dependency."""
+        with self._lock:
+            now = time.monotonic()
+            if self.state == OPEN:
+                if now < self._open_until:
+                    self.rejected += 1
+                    raise CircuitOpenError(self.name, self._open_until - now)
+                self._to_half_open()
+
+            # Calls of an already admitted request are not sampled again
+            if (self.state == HALF_OPEN
+                    and self.name not in _admitted.get()
+                    and random.random() >= self._admit_fraction):
+                self.rejected += 1
+                raise CircuitOpenError(self.name, 1)
+
+    @contextmanager
+    def admission(self) -> Iterator[None]:
+        """
+        Decide admission once for a whole request or document.
+
+        Half-open sampling happens on entry; calls made inside the block
+        (including by tasks started from it) are then let through, so a
+        document fanning out to many calls is not rejected piecemeal.
+        """
+        self.before_call()
+        token = _admitted.set(_admitted.get() | {self.name})
+        try:
+            yield
+        finally:
+            _admitted.reset(token)
+
+    def record_success(self):
+        with self._lock:
+            self._record(True)
+            if self.state == OPEN and time.monotonic() >= self._open_until:
+                # A success after the cool-down (e.g. a health probe) starts recovery
+                # even when no user traffic is reaching before_call
+                self._to_half_open()
+            if self.state == HALF_OPEN:
+                self._admit_fraction = min(1.0, self._admit_fraction * 2)
+                if self._admit_fraction >= 1.0:
+                    self.state = CLOSED
+                    self._cooldown = self.open_seconds
+                    self._outcomes.clear()
+                    logger.info(f"Circuit '{self.name}' closed: dependency recovered")
+
+    def record_failure(self):
+        with self._lock:
+            self._record(False)
+            if self.state == HALF_OPEN or (self.state == OPEN and time.monotonic() >= self._open_until):
+                # Recovery failed: back off longer before the next attempt
+                self._cooldown = min(self.max_open_seconds, self._cooldown * 2)
+                self._to_open()
+            elif self.state == CLOSED and self._should_open():
+                self._to_open()
+
+    async def call(self, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Run fn() through the breaker."""
+        self.before_call()
+        try:
+            result = await fn()
+        except Exception:
+            self.record_failure()
+            raise
+        self.record_success()
+        return result
+
+    def _record(self, ok: bool):
+        now = time.monotonic()
+        self._outcomes.append((now, ok))
+        cutoff = now - self.window_seconds
+        while self._outcomes and self._outcomes[0][0] < cutoff:
+            self._outcomes.popleft()
+
+    def _error_rate(self) -> float:
+        if not self._outcomes:
+            return 0.0
+        return sum(1 for _, ok in self._outcomes if not ok) / len(self._outcomes)
+
+    def _should_open(self) -> bool:
+        return len(self._outcomes) >= self.min_calls and self._error_rate() >= self.error_threshold
+
+    def _to_open(self):
+        self.state = OPEN
+        self.opened += 1
+        self._open_until = time.monotonic() + self._cooldown
+        logger.warning(
+            f"Circuit '{self.name}' opened (error rate {self._error_rate():.0%} over "
+            f"{len(self._outcomes)} calls); failing fast for {self._cooldown:.0f}s"
+        )
+
+    def _to_half_open(self):
+        self.state = HALF_OPEN
+        self._admit_fraction = HALF_OPEN_START_FRACTION
+        logger.info(f"Circuit '{self.name}' half-open: admitting {HALF_OPEN_START_FRACTION:.0%} of calls")
+
+    def stats(self) -> Dict[str, Any]:
+        """Breaker state for /api/health."""
+        with self._lock:
+            retry_after: Optional[float] = None
+            if self.state == OPEN:
+                retry_after = round(max(0.0, self._open_until - time.monotonic()), 1)
+            return {
+                "state": self.state,
+                "error_rate": round(self._error_rate(), 3),
+                "calls_in_window": len(self._outcomes),
+                "admit_fraction": self._admit_fraction if self.state == HALF_OPEN else (0.0 if self.state == OPEN else 1.0),
+                "retry_after_seconds": retry_after,
+                "opened": self.opened,
+                "rejected": self.rejected
+            }
@@ -0,0 +1,146 @@
+# ===========================================
+# FONTA AI STUDY COMPANION - HEALTH PROBES
+# ===========================================
+
+"""
+Background health probes for MongoDB and Gemini.
+Each dependency is probed on its own schedule and the latest result is
+cached, so /api/health answers without any I/O. Probe outcomes also feed
+the circuit breakers, letting an open breaker recover while no user
+traffic is reaching the dependency.
+"""
+
+import os
+import time
+import asyncio
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+import logging
+
+from fastapi.concurrency import run_in_threadpool
+
+from lib.database import database, database_breaker
+from utils.circuit_breaker import CircuitBreaker
+from utils.llm import gemini_breaker, load_gemini_client
+
+logger = logging.getLogger(__name__)
+
+# Probe schedule
+DATABASE_PROBE_INTERVAL = float(os.getenv("HEALTH_PROBE_INTERVAL_SECONDS", "15"))
+GEMINI_PROBE_INTERVAL = float(os.getenv("GEMINI_PROBE_INTERVAL_SECONDS", "60"))
+PROBE_TIMEOUT = float(os.getenv("HEALTH_PROBE_TIMEOUT_SECONDS", "5"))
+
+class HealthProber:
+    """Periodically run a probe and cache its latest result."""
+
+    def __init__(
+        self,
+        name: str,
+        probe: Callable[[], Awaitable[Any]],
+        interval: float,
+        timeout: float = PROBE_TIMEOUT,
+        breaker: Optional[CircuitBreaker] = None
+    ):
+        """
+        Initialize prober.
+
+        Args:
+            name: Dependency name in the health report
+            probe: Coroutine function raising if the dependency is unhealthy
+            interval: Seconds between probes
+            timeout: Seconds before a probe counts as failed
+            breaker: Circuit breaker to report probe outcomes to
+        """
+        self.name = name
+        self.probe = probe
+        self.interval = interval
+        self.timeout = timeout
+        self.breaker = breaker
+        self.result: Dict[str, Any] = {"status": "unknown", "checked_at": None}
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    async def _run(self):
+        while True:
+            await self.check()
+            await asyncio.sleep(self.interval)
+
+    async def check(self) -> Dict[str, Any]:
+        """Run the probe once and cache the outcome."""
+        started = time.perf_counter()
+        try:
+            await asyncio.wait_for(self.probe(), timeout=self.timeout)
+        except Exception as e:
+            error = str(e) or type(e).__name__
+            if self.result.get("status") != "down":
+                logger.warning(f"Health probe '{self.name}' failed: {error}")
+            self.result = {"status": "down", "error": error}
+            if self.breaker:
+                self.breaker.record_failure()
+        else:
+            if self.result.get("status") == "down":
+                logger.info(f"Health probe '{self.name}' recovered")
+            self.result = {"status": "up"}
+            if self.breaker:
+                self.breaker.record_success()
+
+        self.result.update({
+            "latency_ms": round((time.perf_counter() - started) * 1000, 1),
+            "checked_at": datetime.utcnow().isoformat()
+        })
+        return self.result
+
+async def _probe_database():
+    # Straight to the client: the probe must keep running while the breaker is open
+    await database.client.admin.command('ping')
+
+def _probe_gemini_sync():
+    if not os.getenv("GEMINI_API_KEY"):
+        raise RuntimeError("GEMINI_API_KEY is not configured")
+
+    client = load_gemini_client()
+    health_check = getattr(client, "health_check", None)
+    if callable(health_check):
+        health_check()
+        return
+
+    # Cheap authenticated metadata call (no tokens generated)
+    import google.generativeai as genai
+    next(iter(genai.list_models(page_size=1)), None)
+
+async def _probe_gemini():
+    await run_in_threadpool(_probe_gemini_sync)
+
+database_prober = HealthProber("database", _probe_database, DATABASE_PROBE_INTERVAL, breaker=database_breaker)
+gemini_prober = HealthProber("gemini_ai", _probe_gemini, GEMINI_PROBE_INTERVAL, breaker=gemini_breaker)
+
+_probers: List[HealthProber] = [database_prober, gemini_prober]
+
+def start_health_probes():
+    """Start probing every dependency in the background."""
+    for prober in _probers:
+        prober.start()
+
+async def stop_health_probes():
+    for prober in _probers:
+        await prober.stop()
+
+def health_report() -> Dict[str, Any]:
+    """Cached probe results and breaker states (no I/O)."""
+    return {
+        "probes": {prober.name: dict(prober.result) for prober in _probers},
+        "circuits": {
+            "database": database_breaker.stats(),
+            "gemini_ai": gemini_breaker.stats()
+        }
+    }
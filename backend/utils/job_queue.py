@@ -0,0 +1,308 @@
+# ===========================================
+# FONTA AI STUDY COMPANION - SUMMARY JOB QUEUE
+# ===========================================
+
+"""
+MongoDB-backed job queue and worker pool for PDF summarization.
+Uploads are stored in GridFS and jobs in the 'summary_jobs' collection,
+so queued work survives restarts and workers can run in separate processes.
+"""
+
+import os
+import socket
+import asyncio
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Union
+import logging
+
+from bson import ObjectId
+from motor.motor_asyncio import AsyncIOMotorGridFSBucket
+from pymongo import ReturnDocument
+
+from lib.database import database
+from utils.summary_pipeline import summarize_document
+from utils.pdf_processor import PDFPageLimitError
+from utils.circuit_breaker import CircuitOpenError
+from utils.uploads import BufferReader
+
+logger = logging.getLogger(__name__)
+
+# Worker settings
+SUMMARY_WORKERS = int(os.getenv("SUMMARY_WORKERS", "2"))
+JOB_POLL_INTERVAL = float(os.getenv("SUMMARY_JOB_POLL_SECONDS", "1"))
+JOB_LEASE_SECONDS = int(os.getenv("SUMMARY_JOB_LEASE_SECONDS", "120"))
+JOB_MAX_ATTEMPTS = int(os.getenv("SUMMARY_JOB_MAX_ATTEMPTS", "3"))
+
+# Job statuses
+QUEUED = "queued"
+RUNNING = "running"
+COMPLETED = "completed"
+FAILED = "failed"
+
+def get_jobs_collection():
+    """Get summary jobs collection."""
+    return database.get_collection("summary_jobs")
+
+def _uploads_bucket() -> AsyncIOMotorGridFSBucket:
+    """GridFS bucket holding uploads of queued jobs."""
+    return AsyncIOMotorGridFSBucket(database.database, bucket_name="summary_uploads")
+
+async def enqueue_summary_job(content: Union[bytes, bytearray], content_hash: str, file_name: str, user_id: str) -> str:
+    """
+    Store an upload and queue it for summarization.
+
+    Args:
+        content: PDF bytes
+        content_hash: Key from summary_cache_key
+        file_name: Original upload name
+        user_id: Owner of the summary
+
+    Returns:
+        Job ID
+    """
+    # Streamed from the buffer in GridFS-sized blocks rather than copied whole
+    file_id = await _uploads_bucket().upload_from_stream(file_name, BufferReader(content))
+
+    now = datetime.utcnow()
+    job = {
+        "user_id": user_id,
+        "file_name": file_name,
+        "file_id": file_id,
+        "content_hash": content_hash,
+        "status": QUEUED,
+        "attempts": 0,
+        "progress": {},
+        "created_at": now,
+        "updated_at": now
+    }
+    result = await get_jobs_collection().insert_one(job)
+    logger.info(f"Queued summary job {result.inserted_id} for {file_name} (user: {user_id})")
+    return str(result.inserted_id)
+
+async def record_completed_job(result: Dict[str, any], user_id: str) -> str:
+    """Record an already finished job (e.g. a summary cache hit) and return its ID."""
+    now = datetime.utcnow()
+    job = {
+        "user_id": user_id,
+        "file_name": result["file_name"],
+        "status": COMPLETED,
+        "attempts": 0,
+        "progress": {},
+        "result": result,
+        "created_at": now,
+        "updated_at": now,
+        "finished_at": now
+    }
+    inserted = await get_jobs_collection().insert_one(job)
+    return str(inserted.inserted_id)
+
+async def get_job(job_id: str) -> Optional[Dict[str, any]]:
+    """Fetch a job document by ID."""
+    return await get_jobs_collection().find_one({"_id": ObjectId(job_id)})
+
+class SummaryWorkerPool:
+    """Pool of asyncio workers that claim and process summary jobs."""
+
+    def __init__(self, concurrency: int = SUMMARY_WORKERS):
+        """
+        Initialize worker pool.
+
+        Args:
+            concurrency: Number of jobs processed at the same time
+        """
+        self.concurrency = concurrency
+        self.worker_prefix = f"{socket.gethostname()}:{os.getpid()}"
+        self._tasks: List[asyncio.Task] = []
+        self._stopping = asyncio.Event()
+
+    def start(self):
+        """Start the worker tasks."""
+        self._stopping.clear()
+        for i in range(self.concurrency):
+            worker_id = f"{self.worker_prefix}:{i}"
+            self._tasks.append(asyncio.create_task(self._run(worker_id)))
+        logger.info(f"Started {self.concurrency} summary workers")
+
+    async def stop(self):
+        """Stop the workers; interrupted jobs are re-claimed once their lease expires."""
+        self._stopping.set()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        logger.info("Stopped summary workers")
+
+    async def _run(self, worker_id: str):
+        """Claim and process jobs until stopped."""
+        while not self._stopping.is_set():
+            wait = JOB_POLL_INTERVAL
+            try:
+                job = await self._claim(worker_id)
+            except CircuitOpenError as e:
+                # The database is down: wait for its breaker instead of polling (and logging) every second
+                logger.debug(f"Worker {worker_id} waiting {e.retry_after}s for the database: {e.detail}")
+                wait = max(JOB_POLL_INTERVAL, e.retry_after)
+                job = None
+            except Exception as e:
+                logger.error(f"Worker {worker_id} failed to claim a job: {e}")
+                job = None
+
+            if job is None:
+                try:
+                    await asyncio.wait_for(self._stopping.wait(), timeout=wait)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            await self._process(job)
+
+    async def _fail_abandoned(self):
+        """
+        Fail jobs whose lease expired after their last allowed attempt.
+
+        A lease only expires without an outcome when the worker died (e.g. a
+        PDF that gets it OOM-killed), so these jobs are not handed out again.
+        """
+        jobs_collection = get_jobs_collection()
+        while True:
+            now = datetime.utcnow()
+            job = await jobs_collection.find_one_and_update(
+                {"status": RUNNING, "lease_expires_at": {"$lt": now}, "attempts": {"$gte": JOB_MAX_ATTEMPTS}},
+                {"$set": {
+                    "status": FAILED,
+                    "error": f"Worker stopped responding on all {JOB_MAX_ATTEMPTS} attempts",
+                    "finished_at": now,
+                    "updated_at": now
+                }}
+            )
+            if job is None:
+                return
+            logger.error(f"Summary job {job['_id']} failed: lease expired on attempt {job['attempts']}")
+            await self._delete_upload(job)
+
+    async def _claim(self, worker_id: str) -> Optional[Dict[str, any]]:
+        """Atomically claim the oldest queued job, or a running job whose lease expired."""
+        await self._fail_abandoned()
+
+        now = datetime.utcnow()
+        return await get_jobs_collection().find_one_and_update(
+            {
+                "$or": [
+                    {"status": QUEUED},
+                    {"status": RUNNING, "lease_expires_at": {"$lt": now}, "attempts": {"$lt": JOB_MAX_ATTEMPTS}}
+                ]
+            },
+            {
+                "$set": {
+                    "status": RUNNING,
+                    "worker_id": worker_id,
+                    "lease_expires_at": now + timedelta(seconds=JOB_LEASE_SECONDS),
+                    "started_at": now,
+                    "updated_at": now
+                },
+                "$inc": {"attempts": 1}
+            },
+            sort=[("created_at", 1)],
+            return_document=ReturnDocument.AFTER
+        )
+
+    async def _renew_lease(self, job_id: ObjectId):
+        """Keep extending the job lease while it is being processed."""
+        while True:
+            await asyncio.sleep(JOB_LEASE_SECONDS / 3)
+            await get_jobs_collection().update_one(
+                {"_id": job_id, "status": RUNNING},
+                {"$set": {"lease_expires_at": datetime.utcnow() + timedelta(seconds=JOB_LEASE_SECONDS)}}
+            )
+
+    async def _process(self, job: Dict[str, any]):
+        """Run the summarization pipeline for one job and record the outcome."""
+        jobs_collection = get_jobs_collection()
+        job_id = job["_id"]
+        logger.info(f"Processing summary job {job_id} (attempt {job['attempts']})")
+
+        async def on_event(event_type: str, payload: Dict[str, any]):
+            now = datetime.utcnow()
+            if event_type == "progress":
+                update = {f"progress.{key}": value for key, value in payload.items()}
+                await jobs_collection.update_one({"_id": job_id}, {"$set": {**update, "updated_at": now}})
+            elif event_type == "chunk":
+                await jobs_collection.update_one(
+                    {"_id": job_id},
+                    {"$inc": {"progress.chunks_done": 1}, "$set": {"updated_at": now}}
+                )
+
+        lease_task = asyncio.create_task(self._renew_lease(job_id))
+        try:
+            grid_out = await _uploads_bucket().open_download_stream(job["file_id"])
+            content = await grid_out.read()
+
+            # Progress restarts on retry; finished chunks come back from the chunk cache
+            await jobs_collection.update_one({"_id": job_id}, {"$set": {"progress": {"chunks_done": 0}}})
+
+            result = await summarize_document(
+                content,
+                job["content_hash"],
+                job["file_name"],
+                job["user_id"],
+                on_event=on_event
+            )
+
+            await jobs_collection.update_one(
+                {"_id": job_id},
+                {"$set": {
+                    "status": COMPLETED,
+                    "result": {key: value for key, value in result.items() if key != "summary"},
+                    "finished_at": datetime.utcnow(),
+                    "updated_at": datetime.utcnow()
+                }}
+            )
+            await self._delete_upload(job)
+            logger.info(f"Summary job {job_id} completed: {result['summary_id']}")
+
+        except asyncio.CancelledError:
+            # Shutting down: leave the job running so it is re-claimed after the lease expires
+            raise
+        except CircuitOpenError as e:
+            # A dependency is down: not the job's fault, so hand it back without
+            # using up an attempt once the breaker is due to let traffic through
+            logger.warning(f"Summary job {job_id} deferred {e.retry_after}s: {e.detail}")
+            try:
+                await jobs_collection.update_one(
+                    {"_id": job_id},
+                    {
+                        "$set": {
+                            "lease_expires_at": datetime.utcnow() + timedelta(seconds=e.retry_after),
+                            "updated_at": datetime.utcnow()
+                        },
+                        "$inc": {"attempts": -1}
+                    }
+                )
+            except Exception as update_error:
+                # The lease still expires on its own and the job is re-claimed
+                logger.error(f"Could not defer summary job {job_id}: {update_error}")
+        except Exception as e:
+            # An oversized document will not succeed on retry
+            retry = not isinstance(e, PDFPageLimitError) and job["attempts"] < JOB_MAX_ATTEMPTS
+            logger.error(f"Summary job {job_id} failed (attempt {job['attempts']}): {e}")
+
+            await jobs_collection.update_one(
+                {"_id": job_id},
+                {"$set": {
+                    "status": QUEUED if retry else FAILED,
+                    "error": str(e),
+                    "updated_at": datetime.utcnow()
+                }}
+            )
+            if not retry:
+                await self._delete_upload(job)
+
+        finally:
+            lease_task.cancel()
+
+    async def _delete_upload(self, job: Dict[str, any]):
+        """Remove the stored upload once the job no longer needs it."""
+        try:
+            await _uploads_bucket().delete(job["file_id"])
+        except Exception as e:
+            logger.warning(f"Could not delete upload for job {job['_id']}: {e}")
@@ -0,0 +1,182 @@
+# ===========================================
+# FONTA AI STUDY COMPANION - LLM ACCESS
+# ===========================================
+
+"""
+Async access to the Gemini AI client.
+The Gemini SDK is synchronous, so every call is run in the threadpool
+to keep the event loop free for other requests. Identical calls that are
+in flight at the same time are coalesced into a single Gemini request, and
+every request is admitted by the process-wide LLM scheduler. The Gemini
+SDK itself is imported on first use (or by the startup warmup), not at
+import time.
+"""
+
+import os
+import json
+import time
+import asyncio
+import hashlib
+from typing import List, Dict, Optional, Hashable, Callable, Awaitable, Any
+import logging
+
+from fastapi.concurrency import run_in_threadpool
+
+from utils.llm_scheduler import llm_scheduler, Priority, is_overload_error
+from utils.circuit_breaker import CircuitBreaker
+from utils.metrics import record_llm_call
+
+logger = logging.getLogger(__name__)
+
+# Bump whenever prompts or the Gemini model change so cached LLM output is not reused
+PROMPT_VERSION = os.getenv("LLM_PROMPT_VERSION", "1")
+
+_gemini_ai = None
+
+def load_gemini_client():
+    """
+    Import and configure the Gemini client on first use.
+
+    Importing google.generativeai is slow, so it is deferred until the first
+    call (which runs in the threadpool) or the background startup warmup.
+    """
+    global _gemini_ai
+    if _gemini_ai is None:
+        from models.gemini_ai import gemini_ai
+        _gemini_ai = gemini_ai
+    return _gemini_ai
+
+class SingleFlight:
+    """
+    Coalesce concurrent calls that share a key.
+
+    The first caller starts the work in its own task; callers arriving
+    while it runs await the same task. Results and errors reach every
+    waiter, and a waiter disconnecting does not cancel the shared call.
+    """
+
+    def __init__(self):
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+        self.calls = 0
+        self.coalesced = 0
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Run fn() once per key among concurrent callers and return its result."""
+        task = self._inflight.get(key)
+        if task is None:
+            self.calls += 1
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda done, key=key: self._finished(key, done))
+        else:
+            self.coalesced += 1
+
+        return await asyncio.shield(task)
+
+    def _finished(self, key: Hashable, task: asyncio.Task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        # Mark the exception as retrieved even if every waiter went away
+        if not task.cancelled():
+            task.exception()
+
+    def stats(self) -> Dict[str, int]:
+        """Started calls, coalesced callers and calls currently in flight."""
+        return {"calls": self.calls, "coalesced": self.coalesced, "in_flight": len(self._inflight)}
+
+# Shared by every Gemini call in the process
+single_flight = SingleFlight()
+
+# Fails Gemini calls fast (503) while Gemini is erroring instead of waiting on each timeout
+gemini_breaker = CircuitBreaker("Gemini AI")
+
+def is_outage_error(error: Exception) -> bool:
+    """Whether an error means Gemini is unavailable (not a bad prompt or unparseable output)."""
+    return is_overload_error(error) or isinstance(error, (TimeoutError, asyncio.TimeoutError, ConnectionError))
+
+def _invoke(operation: str, *args, **kwargs) -> Any:
+    """Call a Gemini client method (runs in the threadpool, so a first-use import stays off the loop)."""
+    return getattr(load_gemini_client(), operation)(*args, **kwargs)
+
+async def _timed(operation: str, *args, **kwargs) -> Any:
+    """Run a Gemini SDK call in the threadpool, recording latency, outcome and token estimates."""
+    started = time.perf_counter()
+    try:
+        result = await run_in_threadpool(_invoke, operation, *args, **kwargs)
+    except Exception as e:
+        # Prompt and parse errors mean Gemini answered, so they do not count against it
+        if is_outage_error(e):
+            gemini_breaker.record_failure()
+        else:
+            gemini_breaker.record_success()
+        record_llm_call(operation, time.perf_counter() - started, True, [args, kwargs])
+        raise
+    gemini_breaker.record_success()
+    record_llm_call(operation, time.perf_counter() - started, False, [args, kwargs], result)
+    return result
+
+def _call(priority: Priority, operation: str, *args, **kwargs) -> Callable[[], Awaitable[Any]]:
+    """Coroutine factory running a Gemini client method in the threadpool under the scheduler."""
+    async def run():
+        # Checked before queueing so an open breaker fails fast
+        gemini_breaker.before_call()
+        return await llm_scheduler.run(priority, lambda: _timed(operation, *args, **kwargs))
+    return run
+
+def _fingerprint(value: Any) -> str:
+    """Stable hash of a JSON-like value for use in coalescing keys."""
+    encoded = json.dumps(value, sort_keys=True, default=str).encode("utf-8")
+    return hashlib.sha256(encoded).hexdigest()
+
+async def summarize_chunk(text: str, page_hint: Optional[str] = None) -> Dict[str, any]:
+    """Summarize a single PDF chunk."""
+    key = ("summarize_chunk", _fingerprint(text), page_hint)
+    return await single_flight.do(
+        key,
+        _call(Priority.BULK, "summarize_chunk", text, page_hint)
+    )
+
+async def merge_chunk_summaries(chunk_summaries: List[Dict[str, any]]) -> Dict[str, any]:
+    """Merge chunk summaries into one document summary."""
+    key = ("merge_chunk_summaries", _fingerprint(chunk_summaries))
+    return await single_flight.do(
+        key,
+        _call(Priority.STANDARD, "merge_chunk_summaries", chunk_summaries)
+    )
+
+async def generate_quiz(
+    summary: Dict[str, any],
+    num_questions: int = 50,
+    priority: Priority = Priority.INTERACTIVE
+) -> List[Dict[str, any]]:
+    """Generate quiz questions from a document summary (interactive unless no one is waiting)."""
+    key = ("generate_quiz", _fingerprint(summary), num_questions)
+    return await single_flight.do(
+        key,
+        _call(priority, "generate_quiz", summary, num_questions=num_questions)
+    )
+
+async def get_homework_help(
+    question: str,
+    topic: Optional[str] = None,
+    difficulty: Optional[str] = None,
+    coalesce_key: Optional[str] = None
+) -> Dict[str, any]:
+    """
+    Generate a step-by-step homework solution.
+
+    Args:
+        coalesce_key: Optional key treating differently worded but equivalent
+            questions as identical (defaults to the exact question/topic/difficulty)
+    """
+    key = ("get_homework_help", coalesce_key or _fingerprint([question, topic, difficulty]))
+    return await single_flight.do(
+        key,
+        _call(
+            Priority.INTERACTIVE,
+            "get_homework_help",
+            question=question,
+            topic=topic,
+            difficulty=difficulty
+        )
+    )
@@ -0,0 +1,205 @@
+# ===========================================
+# FONTA AI STUDY COMPANION - LLM SCHEDULER
+# ===========================================
+
+"""
+Process-wide governor for Gemini calls.
+Combines a token-bucket rate limit, a maximum number of calls in flight
+and priority classes, and backs off adaptively when Gemini answers with
+429 or 5xx errors.
+"""
+
+import os
+import time
+import heapq
+import asyncio
+import itertools
+from enum import IntEnum
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Scheduler limits
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "16"))
+LLM_RATE_PER_SECOND = float(os.getenv("LLM_RATE_PER_SECOND", "10"))
+LLM_BURST = int(os.getenv("LLM_BURST", "20"))
+
+# Adaptive backoff after throttling or server errors
+BACKOFF_BASE_SECONDS = 1.0
+BACKOFF_MAX_SECONDS = 60.0
+MIN_RATE_FACTOR = 0.1
+
+class Priority(IntEnum):
+    """Scheduling classes; lower values are served first."""
+    INTERACTIVE = 0  # a student is waiting on this single call (homework, quiz)
+    STANDARD = 1     # user-facing but part of a longer job (summary merges)
+    BULK = 2         # high-volume background work (chunk summaries)
+
+def is_overload_error(error: Exception) -> bool:
+    """Whether an error means Gemini is throttling us (429) or failing (5xx)."""
+    code = getattr(error, "code", None) or getattr(error, "status_code", None)
+    try:
+        code = int(code)
+    except (TypeError, ValueError):
+        code = None
+
+    if code is not None:
+        return code == 429 or 500 <= code < 600
+
+    return type(error).__name__ in (
+        "ResourceExhausted", "TooManyRequests", "ServiceUnavailable",
+        "InternalServerError", "DeadlineExceeded"
+    )
+
+class LLMScheduler:
+    """Priority scheduler with rate limiting, a concurrency cap and adaptive backoff."""
+
+    def __init__(
+        self,
+        max_concurrency: int = LLM_MAX_CONCURRENCY,
+        rate_per_second: float = LLM_RATE_PER_SECOND,
+        burst: int = LLM_BURST
+    ):
+        """
+        Initialize scheduler.
+
+        Args:
+            max_concurrency: Maximum Gemini calls in flight
+            rate_per_second: Sustained call start rate
+            burst: Token bucket capacity (calls that may start back to back)
+        """
+        self.max_concurrency = max_concurrency
+        self.rate_per_second = rate_per_second
+        self.burst = max(1, burst)
+
+        self._waiters: List[Tuple[int, int, asyncio.Future]] = []
+        self._sequence = itertools.count()
+        self._active = 0
+        self._tokens = float(self.burst)
+        self._last_refill = time.monotonic()
+        self._rate_factor = 1.0
+        self._backoff = 0.0
+        self._backoff_until = 0.0
+        self._wakeup: Optional[asyncio.TimerHandle] = None
+        self.throttled = 0
+
+    async def run(self, priority: Priority, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Run fn() once the scheduler grants a slot.
+
+        Args:
+            priority: Scheduling class of the call
+            fn: Coroutine factory performing the Gemini call
+        """
+        await self._acquire(priority)
+        try:
+            result = await fn()
+        except Exception as e:
+            if is_overload_error(e):
+                self._on_overload(e)
+            raise
+        else:
+            self._on_success()
+            return result
+        finally:
+            self._release()
+
+    async def _acquire(self, priority: Priority):
+        """Wait until a concurrency slot and a rate token are available."""
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (int(priority), next(self._sequence), future))
+        self._dispatch()
+
+        try:
+            await future
+        except asyncio.CancelledError:
+            # Granted just before the caller was cancelled: hand the slot back
+            if future.done() and not future.cancelled():
+                self._release()
+            raise
+
+    def _release(self):
+        self._active -= 1
+        self._dispatch()
+
+    def _refill(self, now: float):
+        rate = self.rate_per_second * self._rate_factor
+        self._tokens = min(self.burst, self._tokens + (now - self._last_refill) * rate)
+        self._last_refill = now
+
+    def _dispatch(self):
+        """Grant slots to the highest-priority waiters the limits allow."""
+        now = time.monotonic()
+        self._refill(now)
+
+        while self._waiters and self._active < self.max_concurrency:
+            if now < self._backoff_until:
+                self._schedule_wakeup(self._backoff_until - now)
+                return
+
+            if self._tokens < 1:
+                rate = self.rate_per_second * self._rate_factor
+                self._schedule_wakeup((1 - self._tokens) / rate if rate > 0 else 1.0)
+                return
+
+            _, _, future = heapq.heappop(self._waiters)
+            if future.done():
+                # Waiter was cancelled while queued
+                continue
+
+            self._tokens -= 1
+            self._active += 1
+            future.set_result(None)
+
+    def _schedule_wakeup(self, delay: float):
+        if self._wakeup is not None:
+            self._wakeup.cancel()
+        loop = asyncio.get_running_loop()
+        self._wakeup = loop.call_later(max(delay, 0.001), self._on_wakeup)
+
+    def _on_wakeup(self):
+        self._wakeup = None
+        self._dispatch()
+
+    def _on_overload(self, error: Exception):
+        """Pause and halve the rate after a 429/5xx (multiplicative decrease)."""
+        self.throttled += 1
+        self._backoff = min(BACKOFF_MAX_SECONDS, max(BACKOFF_BASE_SECONDS, self._backoff * 2))
+        self._backoff_until = time.monotonic() + self._backoff
+        self._rate_factor = max(MIN_RATE_FACTOR, self._rate_factor / 2)
+        logger.warning(
+            f"Gemini overloaded ({type(error).__name__}); pausing {self._backoff:.1f}s, "
+            f"rate now {self.rate_per_second * self._rate_factor:.2f}/s"
+        )
+
+    def _on_success(self):
+        """Recover the rate gradually after successful calls (additive increase)."""
+        self._backoff = 0.0
+        self._rate_factor = min(1.0, self._rate_factor + 0.05)
+
+    def available_slots(self) -> int:
+        """Calls that could start right now without queueing (for sizing a fan-out)."""
+        if self._waiters or time.monotonic() < self._backoff_until:
+            return 0
+        self._refill(time.monotonic())
+        return max(0, min(int(self._tokens), self.max_concurrency - self._active))
+
+    def stats(self) -> Dict[str, Any]:
+        """Queue depth and limiter state for monitoring."""
+        queued = [entry for entry in self._waiters if not entry[2].done()]
+        return {
+            "queue_depth": len(queued),
+            "queue_depth_by_priority": {
+                level.name.lower(): sum(1 for entry in queued if entry[0] == level)
+                for level in Priority
+            },
+            "active": self._active,
+            "max_concurrency": self.max_concurrency,
+            "rate_per_second": round(self.rate_per_second * self._rate_factor, 2),
+            "backoff_seconds": round(max(0.0, self._backoff_until - time.monotonic()), 2),
+            "throttled": self.throttled
+        }
+
+# Every Gemini call in the process goes through this scheduler
+llm_scheduler = LLMScheduler()
@@ -0,0 +1,234 @@
+# ===========================================
+# FONTA AI STUDY COMPANION - EVENT LOOP MONITOR
+# ===========================================
+
+"""
+Event-loop lag measurement and stall detection.
+A heartbeat task measures how late the loop wakes it up. A watchdog thread
+notices when the heartbeat stops: while the loop is still blocked it
+captures the loop thread's stack and the route of the request being run,
+so blocking calls can be traced to the handler that made them.
+"""
+
+import os
+import sys
+import time
+import asyncio
+import threading
+import traceback
+from collections import deque
+from datetime import datetime
+from typing import Any, Deque, Dict, List, Optional
+import logging
+
+from utils.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+# Monitor settings
+LOOP_MONITOR_ENABLED = os.getenv("LOOP_MONITOR_ENABLED", "true").lower() in ("1", "true", "yes")
+LOOP_MONITOR_INTERVAL = float(os.getenv("LOOP_MONITOR_INTERVAL_MS", "50")) / 1000
+LOOP_STALL_THRESHOLD = float(os.getenv("LOOP_STALL_THRESHOLD_MS", "200")) / 1000
+
+# Lag samples kept for percentiles, stalls kept for inspection, stack frames kept per stall
+LAG_WINDOW = 1200
+RECENT_STALLS = 20
+STACK_DEPTH = 25
+
+# Application code, used to point at the frame that made the blocking call
+_APP_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+loop_lag = registry.histogram(
+    "fonta_event_loop_lag_seconds",
+    "How late the event loop ran the monitor heartbeat",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+)
+loop_stalls = registry.counter(
+    "fonta_event_loop_stalls_total",
+    "Event loop stalls past the threshold, by the route that was running",
+    ("route",)
+)
+
+def _route_label(scope: Dict[str, Any]) -> str:
+    route = getattr(scope.get("route"), "path", None)
+    return f"{scope.get('method', '')} {route or scope.get('path', '')}".strip()
+
+def _running_task(loop: asyncio.AbstractEventLoop) -> Optional[asyncio.Task]:
+    """Task the loop is currently stepping, read from another thread (None if unavailable)."""
+    current_tasks = getattr(asyncio.tasks, "_current_tasks", None)
+    if isinstance(current_tasks, dict):
+        return current_tasks.get(loop)
+    return None
+
+def _blocking_frame(stack: List[traceback.FrameSummary]) -> Optional[str]:
+    """Innermost application frame of a stall stack, as 'file:line in function'."""
+    for frame in reversed(stack):
+        if frame.filename.startswith(_APP_ROOT) and not frame.filename.endswith("loop_monitor.py"):
+            return f"{os.path.relpath(frame.filename, _APP_ROOT)}:{frame.lineno} in {frame.name}"
+    return None
+
+class LoopMonitor:
+    """Heartbeat task plus watchdog thread for one event loop."""
+
+    def __init__(self, interval: float = LOOP_MONITOR_INTERVAL, threshold: float = LOOP_STALL_THRESHOLD):
+        """
+        Initialize monitor.
+
+        Args:
+            interval: Seconds between heartbeats
+            threshold: Loop lag counted as a stall
+        """
+        self.interval = interval
+        self.threshold = threshold
+        self.stalls = 0
+
+        self._lags: Deque[float] = deque(maxlen=LAG_WINDOW)
+        self._recent: Deque[Dict[str, Any]] = deque(maxlen=RECENT_STALLS)
+        self._requests: Dict[asyncio.Task, Dict[str, Any]] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread_id: Optional[int] = None
+        self._last_beat = 0.0
+        self._stall_open: Optional[Dict[str, Any]] = None
+        self._heartbeat: Optional[asyncio.Task] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    def start(self):
+        """Start monitoring the running loop."""
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        self._last_beat = time.monotonic()
+        self._stop.clear()
+        self._heartbeat = asyncio.create_task(self._beat())
+        self._watchdog = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._watchdog.start()
+        logger.info(
+            f"Event loop monitor started (interval {self.interval * 1000:.0f} ms, "
+            f"stall threshold {self.threshold * 1000:.0f} ms)"
+        )
+
+    async def stop(self):
+        """Stop the heartbeat and watchdog."""
+        self._stop.set()
+        if self._heartbeat:
+            self._heartbeat.cancel()
+            try:
+                await self._heartbeat
+            except asyncio.CancelledError:
+                pass
+        if self._watchdog:
+            self._watchdog.join(timeout=1)
+
+    async def _beat(self):
+        while True:
+            expected = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            lag = max(0.0, now - expected)
+            self._last_beat = now
+
+            self._lags.append(lag)
+            loop_lag.observe(lag)
+
+            stall = self._stall_open
+            if stall is not None:
+                # The watchdog saw this stall begin; record how long it lasted
+                stall["duration_ms"] = round(lag * 1000, 1)
+                self._stall_open = None
+                logger.warning(
+                    f"Event loop was blocked for {stall['duration_ms']} ms "
+                    f"(route: {stall['route'] or 'none'}, at {stall['blocking_frame'] or 'unknown'})"
+                )
+
+    def _watch(self):
+        """Watchdog thread: capture the loop thread's stack while it is stalled."""
+        check_every = max(0.01, self.threshold / 2)
+        while not self._stop.wait(check_every):
+            blocked_for = time.monotonic() - self._last_beat - self.interval
+            if blocked_for < self.threshold or self._stall_open is not None:
+                continue
+
+            frame = sys._current_frames().get(self._loop_thread_id)
+            if frame is None:
+                continue
+            stack = traceback.extract_stack(frame)[-STACK_DEPTH:]
+
+            task = _running_task(self._loop)
+            request = self._requests.get(task) if task is not None else None
+            route = _route_label(request) if request else None
+
+            stall = {
+                "detected_at": datetime.utcnow().isoformat(),
+                "route": route,
+                "blocking_frame": _blocking_frame(stack),
+                "duration_ms": round(blocked_for * 1000, 1),
+                "stack": traceback.format_list(stack)
+            }
+            self._stall_open = stall
+            self._recent.append(stall)
+            self.stalls += 1
+            loop_stalls.inc(route=route or "none")
+            logger.warning(
+                f"Event loop stalled for over {self.threshold * 1000:.0f} ms "
+                f"(route: {route or 'none'})\n" + "".join(stall["stack"])
+            )
+
+    def request_started(self, task: asyncio.Task, scope: Dict[str, Any]):
+        """Note that 'task' is serving the request described by the ASGI scope."""
+        self._requests[task] = scope
+
+    def request_finished(self, task: asyncio.Task):
+        self._requests.pop(task, None)
+
+    def percentiles(self) -> Dict[str, Optional[float]]:
+        """Lag percentiles in milliseconds over the recent window."""
+        lags = sorted(self._lags)
+        if not lags:
+            return {"p50_ms": None, "p95_ms": None, "p99_ms": None, "max_ms": None}
+
+        def at(fraction: float) -> float:
+            return round(lags[min(len(lags) - 1, int(fraction * len(lags)))] * 1000, 2)
+
+        return {"p50_ms": at(0.50), "p95_ms": at(0.95), "p99_ms": at(0.99), "max_ms": round(lags[-1] * 1000, 2)}
+
+    def stats(self, include_stacks: bool = False) -> Dict[str, Any]:
+        """Lag percentiles, stall count and recent stalls."""
+        recent = [
+            stall if include_stacks else {key: value for key, value in stall.items() if key != "stack"}
+            for stall in list(self._recent)
+        ]
+        return {
+            "lag": self.percentiles(),
+            "stalls": self.stalls,
+            "stall_threshold_ms": round(self.threshold * 1000, 1),
+            "recent_stalls": recent
+        }
+
+# Monitors the application's event loop (started in the app lifespan)
+loop_monitor = LoopMonitor()
+
+for _fraction in ("p50", "p95", "p99"):
+    registry.gauge(
+        f"fonta_event_loop_lag_{_fraction}_seconds",
+        f"Event loop lag {_fraction} over the last {LAG_WINDOW} heartbeats",
+        lambda key=f"{_fraction}_ms": (loop_monitor.percentiles()[key] or 0) / 1000
+    )
+
+class LoopMonitorMiddleware:
+    """ASGI middleware recording which request each task is serving, for stall attribution."""
+
+    def __init__(self, app, monitor: LoopMonitor = loop_monitor):
+        self.app = app
+        self.monitor = monitor
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        task = asyncio.current_task()
+        self.monitor.request_started(task, scope)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.monitor.request_finished(task)
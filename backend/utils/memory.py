@@ -0,0 +1,59 @@
+# ===========================================
+# FONTA AI STUDY COMPANION - MEMORY MEASUREMENT
+# ===========================================
+
+"""
+Process memory measurement helpers.
+Used to report resident memory around PDF processing.
+"""
+
+import os
+import sys
+from typing import Dict
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+def current_rss_bytes() -> int:
+    """Current resident set size of this process (0 if unavailable)."""
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * _PAGE_SIZE
+    except (OSError, ValueError, IndexError):
+        return 0
+
+def peak_rss_bytes() -> int:
+    """Peak resident set size of this process so far (0 if unavailable)."""
+    if resource is None:
+        return 0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is reported in bytes on macOS and kilobytes elsewhere
+    return peak if sys.platform == "darwin" else peak * 1024
+
+class MemoryTracker:
+    """
+    Track how much a block of work grows process memory.
+
+    The process-wide peak is shared by concurrent requests, so 'peak_growth_mb'
+    is the amount this work raised the high-water mark, not an exact per-request figure.
+    """
+
+    def __init__(self):
+        self.start_rss = current_rss_bytes()
+        self.start_peak = peak_rss_bytes()
+
+    def report(self) -> Dict[str, float]:
+        """Memory figures in MB since the tracker was created."""
+        rss = current_rss_bytes()
+        peak = peak_rss_bytes()
+        mb = 1024 * 1024
+        return {
+            "rss_mb": round(rss / mb, 1),
+            "rss_growth_mb": round((rss - self.start_rss) / mb, 1),
+            "peak_rss_mb": round(peak / mb, 1),
+            "peak_growth_mb": round(max(0, peak - self.start_peak) / mb, 1)
+        }
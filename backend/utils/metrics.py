@@ -0,0 +1,299 @@
+# ===========================================
+# FONTA AI STUDY COMPANION - METRICS
+# ===========================================
+
+"""
+Lightweight in-process metrics with Prometheus text exposition.
+Counters and latency histograms are plain dict updates behind a lock, so
+instrumentation is cheap enough to leave on in production. Scraped from
+GET /api/metrics.
+"""
+
+import time
+import json
+import threading
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Sequence, Tuple, Union
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Latency buckets in seconds, from a cache hit up to a very large PDF
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+LabelValues = Tuple[str, ...]
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+class _Metric:
+    """Base for labelled metrics."""
+
+    metric_type = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, Any]) -> LabelValues:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def header(self) -> List[str]:
+        return [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.metric_type}"
+        ]
+
+class Counter(_Metric):
+    """Monotonically increasing count per label set."""
+
+    metric_type = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return self.header() + [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+            for key, value in items
+        ]
+
+class Histogram(_Metric):
+    """Bucketed distribution of observations (e.g. latencies in seconds) per label set."""
+
+    metric_type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: [per-bucket counts (+Inf last), sum]
+        self._values: Dict[LabelValues, List[Any]] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            entry[0][index] += 1
+            entry[1] += value
+
+    @contextmanager
+    def time(self, **labels) -> Iterator[None]:
+        """Observe the wall time of the enclosed block (awaits included)."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = [(key, list(counts), total) for key, (counts, total) in self._values.items()]
+
+        lines = self.header()
+        for key, counts, total in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = 'le="' + _format_value(bound) + '"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {cumulative}")
+        return lines
+
+class CallbackGauge(_Metric):
+    """Gauge read from a callback at scrape time (cache sizes, queue depths...)."""
+
+    metric_type = "gauge"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        callback: Callable[[], Union[float, Dict[LabelValues, float]]],
+        labelnames: Sequence[str] = ()
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.callback = callback
+
+    def render(self) -> List[str]:
+        try:
+            values = self.callback()
+        except Exception as e:
+            logger.warning(f"Metric {self.name} callback failed: {e}")
+            return []
+
+        if not isinstance(values, dict):
+            values = {(): values}
+        return self.header() + [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+            for key, value in values.items()
+        ]
+
+class MetricsRegistry:
+    """Collection of metrics rendered together in the Prometheus text format."""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+
+    def _register(self, metric: _Metric) -> _Metric:
+        existing = self._metrics.get(metric.name)
+        if existing is not None:
+            return existing
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS
+    ) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def gauge(
+        self,
+        name: str,
+        documentation: str,
+        callback: Callable[[], Union[float, Dict[LabelValues, float]]],
+        labelnames: Sequence[str] = ()
+    ) -> CallbackGauge:
+        return self._register(CallbackGauge(name, documentation, callback, labelnames))
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in list(self._metrics.values()):
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+# Process-wide registry
+registry = MetricsRegistry()
+
+# Content type of the Prometheus text exposition format
+CONTENT_TYPE_LATEST = "text/plain; version=0.0.4; charset=utf-8"
+
+# ===========================================
+# STANDARD METRICS
+# ===========================================
+
+http_requests = registry.counter(
+    "fonta_http_requests_total",
+    "HTTP requests by route template, method and status code",
+    ("route", "method", "status")
+)
+http_request_duration = registry.histogram(
+    "fonta_http_request_duration_seconds",
+    "HTTP request latency by route template (streams: until the last byte)",
+    ("route", "method")
+)
+stage_duration = registry.histogram(
+    "fonta_stage_duration_seconds",
+    "Latency of pipeline stages (upload, extract, summarize_chunk, merge, db_insert...)",
+    ("stage",)
+)
+llm_calls = registry.counter(
+    "fonta_llm_calls_total",
+    "Gemini calls by operation and outcome (ok/error)",
+    ("operation", "status")
+)
+llm_call_duration = registry.histogram(
+    "fonta_llm_call_duration_seconds",
+    "Gemini call latency by operation, excluding scheduler queueing",
+    ("operation",)
+)
+llm_tokens = registry.counter(
+    "fonta_llm_tokens_estimated_total",
+    "Estimated Gemini tokens (about 4 characters per token) by operation and direction",
+    ("operation", "direction")
+)
+
+def time_stage(stage: str):
+    """Context manager timing one pipeline stage."""
+    return stage_duration.time(stage=stage)
+
+def estimate_tokens(value: Any) -> int:
+    """Rough token count of a prompt input or model output (about 4 characters per token)."""
+    if value is None:
+        return 0
+    text = value if isinstance(value, str) else json.dumps(value, default=str)
+    return (len(text) + 3) // 4
+
+def record_llm_call(operation: str, seconds: float, error: bool, prompt: Any, output: Any = None):
+    """Record one completed Gemini call."""
+    llm_calls.inc(operation=operation, status="error" if error else "ok")
+    llm_call_duration.observe(seconds, operation=operation)
+    llm_tokens.inc(estimate_tokens(prompt), operation=operation, direction="input")
+    if not error:
+        llm_tokens.inc(estimate_tokens(output), operation=operation, direction="output")
+
+class MetricsMiddleware:
+    """
+    ASGI middleware counting requests and timing them per route template.
+
+    Route templates (e.g. /api/quiz/{quiz_id}) keep label cardinality
+    bounded; requests that match no route are labelled 'unmatched'.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = getattr(scope.get("route"), "path", None)
+            if route is None:
+                endpoint = scope.get("endpoint")
+                route = getattr(endpoint, "__name__", "unmatched") if endpoint else "unmatched"
+            method = scope.get("method", "")
+            http_requests.inc(route=route, method=method, status=status["code"])
+            http_request_duration.observe(time.perf_counter() - started, route=route, method=method)
@@ -0,0 +1,108 @@
+# ===========================================
+# FONTA AI STUDY COMPANION - PAGINATION
+# ===========================================
+
+"""
+Keyset (cursor) pagination for per-user history endpoints.
+Pages are ordered by (created_at, _id) descending and served from the
+(user_id, created_at, _id) compound indexes, so every page costs the same
+no matter how much history a user has. List views fetch only the fields
+they show, selected with history_projection.
+"""
+
+import json
+import base64
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from bson import ObjectId
+from bson.errors import InvalidId
+from fastapi import HTTPException
+
+# History page sizes
+DEFAULT_PAGE_LIMIT = 20
+MAX_PAGE_LIMIT = 100
+
+HISTORY_SORT = [("created_at", -1), ("_id", -1)]
+
+def encode_cursor(doc: Dict[str, any]) -> str:
+    """Opaque cursor pointing just after the given document."""
+    raw = json.dumps([doc["created_at"], str(doc["_id"])])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> Tuple[str, ObjectId]:
+    """Decode a cursor from encode_cursor, raising a 400 if it is malformed."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, doc_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return created_at, ObjectId(doc_id)
+    except (ValueError, TypeError, InvalidId):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def history_projection(
+    fields: Optional[str],
+    available: Dict[str, any],
+    default: Sequence[str]
+) -> Dict[str, any]:
+    """
+    MongoDB projection for a history list view.
+
+    Args:
+        fields: Caller's comma-separated field selector (None for the defaults)
+        available: Response field -> projection value (1, or an aggregation
+            expression computed by the server, e.g. a stored count)
+        default: Fields returned when no selector is given
+
+    Returns:
+        Projection that always keeps '_id' and 'created_at' (needed for the cursor)
+    """
+    names = list(default) if not fields else [name.strip() for name in fields.split(",") if name.strip()]
+
+    unknown = [name for name in names if name not in available]
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown fields: {', '.join(unknown)}. Available: {', '.join(available)}"
+        )
+
+    projection = {name: available[name] for name in names}
+    projection["created_at"] = 1
+    return projection
+
+async def paginate_history(
+    collection,
+    user_id: str,
+    limit: int = DEFAULT_PAGE_LIMIT,
+    cursor: Optional[str] = None,
+    projection: Optional[Dict[str, any]] = None
+) -> Tuple[List[Dict[str, any]], Optional[str]]:
+    """
+    Fetch one page of a user's documents, newest first.
+
+    Args:
+        collection: Collection with 'user_id' and 'created_at' fields
+        user_id: Owner of the documents
+        limit: Page size
+        cursor: next_cursor from the previous page, if any
+        projection: Optional field projection
+
+    Returns:
+        Tuple of (documents, next_cursor or None when this is the last page)
+    """
+    query: Dict[str, any] = {"user_id": user_id}
+
+    if cursor:
+        created_at, doc_id = decode_cursor(cursor)
+        query["$or"] = [
+            {"created_at": {"$lt": created_at}},
+            {"created_at": created_at, "_id": {"$lt": doc_id}}
+        ]
+
+    # Fetch one extra document to learn whether another page exists
+    docs = await collection.find(query, projection).sort(HISTORY_SORT).limit(limit + 1).to_list(length=limit + 1)
+
+    next_cursor = None
+    if len(docs) > limit:
+        docs = docs[:limit]
+        next_cursor = encode_cursor(docs[-1])
+
+    return docs, next_cursor
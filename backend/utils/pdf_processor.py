@@ -7,131 +7,458 @@ PDF text extraction and chunking utilities.
 Handles large PDFs (up to 400 pages) with overlap for context preservation.
 """
 
-import fitz  # PyMuPDF
-from typing import List, Dict
+import os
+import re
+import shutil
+import threading
+import multiprocessing
+from multiprocessing import shared_memory
+from concurrent.futures import ProcessPoolExecutor
+from typing import TYPE_CHECKING, List, Dict, NamedTuple, Optional, Union, Tuple, Iterable, Iterator
 import logging
 
+if TYPE_CHECKING:
+    import fitz  # PyMuPDF, imported at runtime by load_fitz
+
 logger = logging.getLogger(__name__)
 
+# A PDF can be given as a file path or as the raw bytes of an upload
+PDFSource = Union[str, bytes, bytearray]
+
+# Parallel extraction settings (0 workers disables the process pool)
+PDF_EXTRACT_WORKERS = int(os.getenv("PDF_EXTRACT_WORKERS", str(min(4, os.cpu_count() or 1))))
+PDF_PARALLEL_MIN_PAGES = int(os.getenv("PDF_PARALLEL_MIN_PAGES", "50"))
+
+# Largest in-memory upload shared with extraction workers; bigger ones are extracted in-process
+PDF_SHARED_MEMORY_MAX_BYTES = int(float(os.getenv("PDF_SHARED_MEMORY_MAX_MB", "64")) * 1024 * 1024)
+
+# Sentence and paragraph boundaries used by the chunker
+_PARAGRAPH_BREAK = re.compile(r"\n\s*\n")
+_SENTENCE_BREAK = re.compile(r"(?<=[.!?])\s+")
+_SENTENCE_TERMINATORS = ('.', '!', '?', '."', ".'", '?"', '!"', '.)')
+
+_fitz = None
+
+def load_fitz():
+    """
+    Import PyMuPDF on first use.
+
+    Deferred so API startup (and every spawned extraction worker) does not
+    pay for loading the PDF engine before a PDF actually arrives.
+    """
+    global _fitz
+    if _fitz is None:
+        import fitz  # PyMuPDF
+        _fitz = fitz
+    return _fitz
+
+_process_pool: Optional[ProcessPoolExecutor] = None
+_process_pool_lock = threading.Lock()
+
+def _get_process_pool(workers: int) -> ProcessPoolExecutor:
+    """Shared extraction process pool, created on first use."""
+    global _process_pool
+    with _process_pool_lock:
+        if _process_pool is None:
+            # Spawn rather than fork: the API process runs threads (Motor, threadpool)
+            _process_pool = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return _process_pool
+
+def _open_source(source: PDFSource) -> "fitz.Document":
+    """Open a PDF from a path or an in-memory buffer."""
+    if isinstance(source, (bytes, bytearray)):
+        # PyMuPDF copies a bytearray stream with bytes(); a memoryview is used as is
+        return load_fitz().open(stream=memoryview(source), filetype="pdf")
+    return load_fitz().open(source)
+
+class _SharedPDF(NamedTuple):
+    """Name and size of a shared-memory segment holding an uploaded PDF."""
+    name: str
+    size: int
+
+def _share_buffer(source: Union[bytes, bytearray]) -> Optional[shared_memory.SharedMemory]:
+    """
+    Copy an upload into a shared-memory segment for the extraction workers.
+
+    Returns None when the upload is over PDF_SHARED_MEMORY_MAX_BYTES or
+    /dev/shm lacks room (writing past it would crash the process).
+    """
+    if len(source) > PDF_SHARED_MEMORY_MAX_BYTES:
+        return None
+    if os.path.isdir("/dev/shm") and shutil.disk_usage("/dev/shm").free < 2 * len(source):
+        return None
+    try:
+        segment = shared_memory.SharedMemory(create=True, size=len(source))
+    except OSError as e:
+        logger.warning(f"Could not allocate shared memory for PDF extraction: {e}")
+        return None
+    segment.buf[:len(source)] = source
+    return segment
+
+def _read_pages(source: Union[PDFSource, memoryview], start: int, end: int) -> List[Tuple[int, str]]:
+    if isinstance(source, memoryview):
+        doc = load_fitz().open(stream=source, filetype="pdf")
+    else:
+        doc = _open_source(source)
+    try:
+        results = []
+        for page_num in range(start, end):
+            page_text = doc[page_num].get_text()
+            if page_text.strip():
+                results.append((page_num + 1, page_text))
+        return results
+    finally:
+        doc.close()
+
+def _extract_page_range(source: Union[str, _SharedPDF], start: int, end: int) -> List[Tuple[int, str]]:
+    """
+    Extract text for pages [start, end) in a worker process.
+
+    Each worker opens its own copy of the document, since PyMuPDF
+    documents cannot be shared across processes. In-memory uploads are
+    read from the parent's shared-memory segment without copying.
+
+    Returns:
+        List of (page_number, text) for non-empty pages
+    """
+    if not isinstance(source, _SharedPDF):
+        return _read_pages(source, start, end)
+
+    # Spawned workers share the parent's resource tracker, so attaching here
+    # does not register the segment a second time; the parent unlinks it
+    segment = shared_memory.SharedMemory(name=source.name)
+    view = segment.buf[:source.size]
+    try:
+        return _read_pages(view, start, end)
+    finally:
+        view.release()
+        segment.close()
+
+class PDFPageLimitError(ValueError):
+    """Raised when a PDF has more pages than the processor allows."""
+
 class PDFProcessor:
     """PDF text extraction and chunking."""
 
-    def __init__(self, chunk_size: int = 2000, overlap: int = 200):
+    def __init__(
+        self,
+        chunk_size: int = 2000,
+        overlap: int = 200,
+        max_pages: Optional[int] = None,
+        extract_workers: int = PDF_EXTRACT_WORKERS,
+        parallel_min_pages: int = PDF_PARALLEL_MIN_PAGES
+    ):
         """
         Initialize PDF processor.
 
         Args:
             chunk_size: Target words per chunk (1500-2500 range)
             overlap: Words to overlap between chunks for context
+            max_pages: Optional page limit checked before any text is extracted
+            extract_workers: Processes used for parallel page extraction (0 or 1 disables it)
+            parallel_min_pages: Documents shorter than this are extracted in-process
         """
         self.chunk_size = chunk_size
         self.overlap = overlap
+        self.max_pages = max_pages
+        self.extract_workers = extract_workers
+        self.parallel_min_pages = parallel_min_pages
 
-    def extract_text_from_pdf(self, pdf_path: str) -> Dict[str, any]:
+    def open_document(self, source: PDFSource) -> "fitz.Document":
         """
-        Extract text from PDF with page information.
+        Open a PDF from a path or directly from an in-memory buffer.
 
         Args:
-            pdf_path: Path to PDF file
+            source: Path to PDF file or PDF bytes
 
         Returns:
-            Dict with 'text', 'pages', and 'page_texts' (list of page texts with page numbers)
+            Open PyMuPDF document
         """
-        try:
-            doc = fitz.open(pdf_path)
-            full_text = ""
-            page_texts = []
+        doc = _open_source(source)
 
-            for page_num in range(len(doc)):
-                page = doc[page_num]
-                page_text = page.get_text()
+        if self.max_pages and len(doc) > self.max_pages:
+            page_count = len(doc)
+            doc.close()
+            raise PDFPageLimitError(
+                f"PDF has {page_count} pages; the maximum is {self.max_pages}"
+            )
+
+        return doc
+
+    def iter_page_texts(self, source: PDFSource, doc: "fitz.Document") -> Iterator[Tuple[int, str]]:
+        """
+        Yield (page_number, text) for non-empty pages, in page order.
+
+        Large documents are split into one contiguous page range per worker
+        and extracted in the process pool; small ones are read page by page
+        from the already open document.
+
+        Workers get a path, or for an in-memory upload a shared-memory copy
+        of it (one extra copy in RAM while extracting, never written to
+        disk). Uploads too large to share are extracted in-process.
+        """
+        page_count = len(doc)
+        workers = min(self.extract_workers, page_count)
+
+        segment = None
+        if workers > 1 and page_count >= self.parallel_min_pages and isinstance(source, (bytes, bytearray)):
+            segment = _share_buffer(source)
+            if segment is None:
+                logger.info(f"Extracting {len(source)} byte PDF in-process: too large to share with workers")
+                workers = 1
 
+        if workers <= 1 or page_count < self.parallel_min_pages:
+            for page_num in range(page_count):
+                page_text = doc[page_num].get_text()
                 if page_text.strip():
-                    full_text += page_text + "\n\n"
-                    page_texts.append({
-                        "page": page_num + 1,
-                        "text": page_text.strip()
-                    })
+                    yield page_num + 1, page_text
+            return
 
-            doc.close()
+        # Contiguous ranges keep pages ordered when the results are concatenated
+        step = -(-page_count // workers)
+        starts = list(range(0, page_count, step))
+        ends = [min(start + step, page_count) for start in starts]
+
+        # Never pickle the upload itself into each worker task
+        shared = _SharedPDF(segment.name, len(source)) if segment else source
+
+        try:
+            pool = _get_process_pool(self.extract_workers)
+            futures = [pool.submit(_extract_page_range, shared, start, end) for start, end in zip(starts, ends)]
+            try:
+                for future in futures:
+                    yield from future.result()
+            finally:
+                if segment:
+                    # Workers must be done with the segment before it is unlinked
+                    for future in futures:
+                        future.cancel()
+                    for future in futures:
+                        if not future.cancelled():
+                            future.exception()
+        finally:
+            if segment:
+                segment.close()
+                segment.unlink()
+
+    def extract_text_from_pdf(self, pdf_path: PDFSource) -> Dict[str, any]:
+        """
+        Extract text from PDF with page information.
+
+        Args:
+            pdf_path: Path to PDF file or PDF bytes
+
+        Returns:
+            Dict with 'text', 'pages', and 'page_texts' (list of page texts with page numbers)
+        """
+        try:
+            doc = self.open_document(pdf_path)
+            page_count = len(doc)
+            try:
+                pages = list(self.iter_page_texts(pdf_path, doc))
+            finally:
+                doc.close()
+
+            page_texts = [
+                {"page": page_num, "text": page_text.strip()}
+                for page_num, page_text in pages
+            ]
+            full_text = "\n\n".join(page_text for _, page_text in pages)
 
             return {
                 "text": full_text.strip(),
-                "pages": len(doc),
+                "pages": page_count,
                 "page_texts": page_texts
             }
 
+        except PDFPageLimitError:
+            raise
         except Exception as e:
             logger.error(f"PDF extraction error: {e}")
             raise Exception(f"Failed to extract text from PDF: {str(e)}")
 
-    def chunk_text(self, text: str, page_info: List[Dict] = None) -> List[Dict[str, any]]:
+    def _iter_sentences(self, pages: Iterable[Tuple[int, str]]) -> Iterator[Tuple[int, int, List[str], bool]]:
         """
-        Chunk text into overlapping segments.
+        Split page texts into sentences.
+
+        Sentences cut by a page break are joined with their continuation on
+        the next page.
+
+        Yields:
+            (start_page, end_page, words, ends_paragraph)
+        """
+        carry = None  # (start_page, end_page, words) of a sentence continuing on the next page
+
+        for page_num, page_text in pages:
+            paragraphs = _PARAGRAPH_BREAK.split(page_text.strip())
+
+            for p_idx, paragraph in enumerate(paragraphs):
+                sentences = _SENTENCE_BREAK.split(paragraph.strip())
+
+                for s_idx, sentence in enumerate(sentences):
+                    words = sentence.split()
+                    if not words:
+                        continue
+
+                    start_page = page_num
+                    if carry:
+                        if len(carry[2]) + len(words) <= self.chunk_size:
+                            start_page, words = carry[0], carry[2] + words
+                        else:
+                            # Too long to join: keep the fragment on its own pages
+                            yield carry[0], carry[1], carry[2], False
+                        carry = None
+
+                    last_on_page = p_idx == len(paragraphs) - 1 and s_idx == len(sentences) - 1
+                    if (last_on_page
+                            and not words[-1].endswith(_SENTENCE_TERMINATORS)
+                            and len(words) < self.chunk_size):
+                        carry = (start_page, page_num, words)
+                        continue
+
+                    yield start_page, page_num, words, s_idx == len(sentences) - 1
+
+        if carry:
+            yield carry[0], carry[1], carry[2], True
+
+    def iter_chunks(
+        self,
+        pages: Iterable[Tuple[int, str]],
+        totals: Optional[Dict[str, int]] = None
+    ) -> Iterator[Dict[str, any]]:
+        """
+        Chunk page texts into overlapping, sentence-aligned segments in one pass.
+
+        Chunks end on sentence boundaries (preferring paragraph ends once a
+        chunk is three quarters full) and carry whole trailing sentences of up
+        to 'overlap' words into the next chunk. Only the current chunk is held
+        in memory, so pages can be streamed straight from the PDF.
 
         Args:
-            text: Full text to chunk
-            page_info: Optional page information for tracking source pages
+            pages: Iterable of (page_number, text)
+            totals: Optional dict whose 'words' entry receives the document word count
 
-        Returns:
-            List of chunks with text and page hints
+        Yields:
+            Chunks with text, word count, exact start/end pages and a page hint
         """
-        words = text.split()
-        chunks = []
+        min_fill = int(self.chunk_size * 0.75)
+        # Oversized sentences are split so overlap + piece never exceeds chunk_size
+        max_piece = max(1, self.chunk_size - self.overlap)
 
-        i = 0
+        buffer: List[Tuple[int, int, List[str]]] = []
+        buffer_words = 0
+        has_new_text = False
         chunk_index = 0
+        word_total = 0
 
-        while i < len(words):
-            # Get chunk with specified size
-            chunk_words = words[i:i + self.chunk_size]
-            chunk_text = " ".join(chunk_words)
+        def build_chunk() -> Dict[str, any]:
+            start_page, end_page = buffer[0][0], buffer[-1][1]
+            return {
+                "chunk_index": chunk_index,
+                "text": " ".join(" ".join(words) for _, _, words in buffer),
+                "word_count": buffer_words,
+                "start_page": start_page,
+                "end_page": end_page,
+                "page_hint": f"p. {start_page}" if start_page == end_page else f"pp. {start_page}-{end_page}"
+            }
 
-            # Determine page range for this chunk if page_info provided
-            page_hint = None
-            if page_info:
-                # Simple heuristic: estimate page based on position in text
-                progress = i / len(words)
-                estimated_page = int(progress * len(page_info)) + 1
-                page_hint = f"p. {estimated_page}"
+        def overlap_tail() -> List[Tuple[int, int, List[str]]]:
+            tail = []
+            tail_words = 0
+            for sentence in reversed(buffer):
+                if tail_words + len(sentence[2]) > self.overlap:
+                    break
+                tail.insert(0, sentence)
+                tail_words += len(sentence[2])
+            return tail
 
-            chunks.append({
-                "chunk_index": chunk_index,
-                "text": chunk_text,
-                "word_count": len(chunk_words),
-                "page_hint": page_hint
-            })
+        for start_page, end_page, words, ends_paragraph in self._iter_sentences(pages):
+            word_total += len(words)
+
+            for offset in range(0, len(words), max_piece):
+                piece = words[offset:offset + max_piece]
 
-            # Move forward by chunk_size minus overlap
-            i += self.chunk_size - self.overlap
-            chunk_index += 1
+                if has_new_text and buffer_words + len(piece) > self.chunk_size:
+                    yield build_chunk()
+                    chunk_index += 1
+                    buffer = overlap_tail()
+                    buffer_words = sum(len(sentence[2]) for sentence in buffer)
+                    has_new_text = False
 
-            # Break if we're at the end
-            if i >= len(words):
-                break
+                buffer.append((start_page, end_page, piece))
+                buffer_words += len(piece)
+                has_new_text = True
 
-        logger.info(f"Created {len(chunks)} chunks from text with {len(words)} words")
+            if ends_paragraph and buffer_words >= min_fill:
+                yield build_chunk()
+                chunk_index += 1
+                buffer = overlap_tail()
+                buffer_words = sum(len(sentence[2]) for sentence in buffer)
+                has_new_text = False
+
+        if has_new_text:
+            yield build_chunk()
+
+        if totals is not None:
+            totals["words"] = word_total
+
+    def chunk_text(self, text: str, page_info: List[Dict] = None) -> List[Dict[str, any]]:
+        """
+        Chunk text into overlapping segments.
+
+        Args:
+            text: Full text to chunk
+            page_info: Optional page information for tracking source pages
+
+        Returns:
+            List of chunks with text and page ranges
+        """
+        if page_info:
+            pages = [(page["page"], page["text"]) for page in page_info]
+        else:
+            pages = [(1, text)]
+
+        totals = {}
+        chunks = list(self.iter_chunks(pages, totals))
+
+        logger.info(f"Created {len(chunks)} chunks from text with {totals['words']} words")
         return chunks
 
-    def process_pdf(self, pdf_path: str) -> Dict[str, any]:
+    def process_pdf(self, pdf_path: PDFSource) -> Dict[str, any]:
         """
         Complete PDF processing: extract and chunk.
 
+        Pages are chunked as they are extracted, so the full document text,
+        its word list and the per-page texts are never held at once.
+
         Args:
-            pdf_path: Path to PDF file
+            pdf_path: Path to PDF file or PDF bytes
 
         Returns:
-            Dict with extracted data and chunks
+            Dict with 'pages', 'chunks' and 'total_words'
         """
-        extraction_result = self.extract_text_from_pdf(pdf_path)
-        chunks = self.chunk_text(
-            extraction_result["text"],
-            extraction_result.get("page_texts")
-        )
+        try:
+            doc = self.open_document(pdf_path)
+            page_count = len(doc)
+            totals = {}
+            try:
+                chunks = list(self.iter_chunks(self.iter_page_texts(pdf_path, doc), totals))
+            finally:
+                doc.close()
+
+        except PDFPageLimitError:
+            raise
+        except Exception as e:
+            logger.error(f"PDF extraction error: {e}")
+            raise Exception(f"Failed to extract text from PDF: {str(e)}")
+
+        logger.info(f"Created {len(chunks)} chunks from {page_count} pages with {totals['words']} words")
 
         return {
-            "text": extraction_result["text"],
-            "pages": extraction_result["pages"],
+            "pages": page_count,
             "chunks": chunks,
-            "total_words": len(extraction_result["text"].split())
+            "total_words": totals["words"]
         }
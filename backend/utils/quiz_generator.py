@@ -0,0 +1,293 @@
+# ===========================================
+# FONTA AI STUDY COMPANION - QUIZ GENERATOR
+# ===========================================
+
+"""
+Parallel quiz generation.
+Splits a summary into sections, generates a sub-batch of questions per
+section concurrently, removes near-duplicate questions and tops up the
+quiz if it comes back short. Quizzes can also be pre-generated in the
+background as soon as a summary is stored.
+"""
+
+import os
+import re
+import time
+import asyncio
+from datetime import datetime, timedelta
+from typing import List, Dict, Set, Optional
+import logging
+
+from utils import llm
+from utils.llm_scheduler import Priority, llm_scheduler
+from utils.circuit_breaker import CircuitOpenError
+from lib.database import database
+
+logger = logging.getLogger(__name__)
+
+# Most sub-batches generated in parallel (fewer when the LLM scheduler has
+# little headroom), top-up rounds for a short quiz, and the similarity above
+# which two questions count as duplicates
+QUIZ_BATCHES = int(os.getenv("QUIZ_BATCHES", "5"))
+QUIZ_TOPUP_ROUNDS = int(os.getenv("QUIZ_TOPUP_ROUNDS", "3"))
+DUPLICATE_SIMILARITY = 0.8
+
+_WORD = re.compile(r"\w+")
+
+def split_summary_sections(summary: Dict[str, any], parts: int) -> List[Dict[str, any]]:
+    """
+    Split a summary into up to 'parts' sub-summaries covering different material.
+
+    List-valued fields (key points, definitions, sections...) are cut into
+    contiguous slices; other fields (title, overview...) are kept in every part.
+
+    Args:
+        summary: Merged document summary
+        parts: Desired number of sections
+
+    Returns:
+        List of sub-summaries (just [summary] if nothing can be split)
+    """
+    list_fields = {key: value for key, value in summary.items() if isinstance(value, list) and value}
+    if parts <= 1 or not list_fields:
+        return [summary]
+
+    parts = min(parts, max(len(value) for value in list_fields.values()))
+    sections = []
+    for index in range(parts):
+        section = {key: value for key, value in summary.items() if key not in list_fields}
+        for key, value in list_fields.items():
+            start = index * len(value) // parts
+            end = (index + 1) * len(value) // parts
+            if end > start:
+                section[key] = value[start:end]
+        sections.append(section)
+    return sections
+
+def _question_tokens(question: Dict[str, any]) -> Set[str]:
+    text = question.get("question", "") if isinstance(question, dict) else str(question)
+    return set(_WORD.findall(text.lower()))
+
+def _is_near_duplicate(tokens: Set[str], seen: List[Set[str]]) -> bool:
+    for other in seen:
+        union = tokens | other
+        if union and len(tokens & other) / len(union) >= DUPLICATE_SIMILARITY:
+            return True
+    return False
+
+def merge_questions(
+    batches: List[List[Dict[str, any]]],
+    limit: int,
+    existing: List[Dict[str, any]] = None
+) -> List[Dict[str, any]]:
+    """
+    Concatenate question batches, dropping near-duplicates, up to 'limit' questions.
+
+    Args:
+        batches: Question lists in section order
+        limit: Maximum number of questions to keep
+        existing: Questions already accepted (kept first)
+    """
+    questions = list(existing or [])
+    seen = [_question_tokens(question) for question in questions]
+
+    for batch in batches:
+        for question in batch:
+            if len(questions) >= limit:
+                return questions
+            tokens = _question_tokens(question)
+            if not tokens or _is_near_duplicate(tokens, seen):
+                continue
+            questions.append(question)
+            seen.append(tokens)
+
+    return questions
+
+async def generate_quiz_questions(
+    summary: Dict[str, any],
+    num_questions: int = 50,
+    batches: int = QUIZ_BATCHES,
+    priority: Priority = Priority.INTERACTIVE
+) -> List[Dict[str, any]]:
+    """
+    Generate a quiz from a summary with parallel section-based sub-batches.
+
+    Args:
+        summary: Merged document summary
+        num_questions: Target number of questions
+        batches: Most sub-batches generated concurrently
+        priority: Scheduling class of the Gemini calls
+
+    Returns:
+        Up to num_questions de-duplicated questions
+    """
+    # Admitted as one unit so a recovering breaker does not reject single sub-batches
+    with llm.gemini_breaker.admission():
+        return await _generate_quiz_questions(summary, num_questions, batches, priority)
+
+async def _generate_quiz_questions(
+    summary: Dict[str, any],
+    num_questions: int,
+    batches: int,
+    priority: Priority
+) -> List[Dict[str, any]]:
+    # Only fan out as wide as the scheduler can start at once; queued
+    # sub-batches would just wait behind each other
+    batches = max(1, min(batches, llm_scheduler.available_slots()))
+    sections = split_summary_sections(summary, batches)
+
+    # Spread the questions over the sections, giving earlier sections the remainder
+    sizes = [
+        num_questions // len(sections) + (1 if index < num_questions % len(sections) else 0)
+        for index in range(len(sections))
+    ]
+
+    results = await asyncio.gather(
+        *(llm.generate_quiz(section, num_questions=size, priority=priority) for section, size in zip(sections, sizes) if size),
+        return_exceptions=True
+    )
+
+    question_batches = []
+    for index, result in enumerate(results):
+        if isinstance(result, Exception):
+            logger.error(f"Quiz sub-batch {index + 1}/{len(results)} failed: {result}")
+        else:
+            question_batches.append(result)
+
+    if not question_batches:
+        circuit_errors = [result for result in results if isinstance(result, CircuitOpenError)]
+        if circuit_errors:
+            raise circuit_errors[0]
+        raise Exception("Failed to generate any quiz questions")
+
+    questions = merge_questions(question_batches, num_questions)
+
+    # Top up from the whole summary while failures or duplicates leave the
+    # quiz short, until a round adds nothing new
+    for round_number in range(1, QUIZ_TOPUP_ROUNDS + 1):
+        missing = num_questions - len(questions)
+        if missing <= 0:
+            break
+        logger.info(f"Quiz short by {missing} questions after de-duplication, top-up round {round_number}")
+        try:
+            extra = await llm.generate_quiz(summary, num_questions=missing + max(2, missing // 5), priority=priority)
+        except Exception as e:
+            logger.error(f"Quiz top-up failed: {e}")
+            break
+        before = len(questions)
+        questions = merge_questions([extra], num_questions, existing=questions)
+        if len(questions) == before:
+            logger.info("Quiz top-up produced no new questions; the summary is exhausted")
+            break
+
+    logger.info(f"Generated {len(questions)} questions from {len(question_batches)} sub-batches")
+    return questions
+
+# ===========================================
+# SPECULATIVE PRE-GENERATION
+# ===========================================
+
+# Opt-in: start generating a quiz as soon as a summary is stored
+QUIZ_PREGENERATE = os.getenv("QUIZ_PREGENERATE", "false").lower() in ("1", "true", "yes")
+PREGENERATION_WAIT_SECONDS = float(os.getenv("QUIZ_PREGENERATION_WAIT_SECONDS", "60"))
+PREGENERATION_TTL_HOURS = float(os.getenv("QUIZ_PREGENERATION_TTL_HOURS", "24"))
+
+# Pre-generation tasks running in this process, by summary ID
+_pregeneration_tasks: Dict[str, asyncio.Task] = {}
+
+def get_pregenerations_collection():
+    """Get pre-generated quizzes collection."""
+    return database.get_collection("quiz_pregenerations")
+
+def schedule_quiz_pregeneration(summary_id: str, summary: Dict[str, any]):
+    """
+    Start generating a quiz for a freshly stored summary in the background.
+
+    Nothing is charged to the user here; quota is reserved only when the
+    quiz is actually requested.
+
+    Args:
+        summary_id: ID of the stored summary
+        summary: Merged summary content
+    """
+    if summary_id in _pregeneration_tasks:
+        return
+
+    task = asyncio.create_task(_pregenerate(summary_id, summary))
+    _pregeneration_tasks[summary_id] = task
+    task.add_done_callback(lambda done: _pregeneration_finished(summary_id, done))
+    logger.info(f"Scheduled quiz pre-generation for summary: {summary_id}")
+
+def _pregeneration_finished(summary_id: str, task: asyncio.Task):
+    _pregeneration_tasks.pop(summary_id, None)
+    # Failures are already logged by _pregenerate; mark them retrieved
+    if not task.cancelled():
+        task.exception()
+
+async def _pregenerate(summary_id: str, summary: Dict[str, any]) -> List[Dict[str, any]]:
+    """Generate and persist a quiz for later pickup by take_pregenerated_questions."""
+    collection = get_pregenerations_collection()
+    now = datetime.utcnow()
+    expires_at = now + timedelta(hours=PREGENERATION_TTL_HOURS)
+
+    await collection.replace_one(
+        {"_id": summary_id},
+        {"status": "running", "created_at": now, "expires_at": expires_at},
+        upsert=True
+    )
+
+    try:
+        # Speculative, so it yields to quiz and homework requests a student is waiting on
+        questions = await generate_quiz_questions(summary, num_questions=50, priority=Priority.STANDARD)
+    except Exception as e:
+        logger.error(f"Quiz pre-generation failed for summary {summary_id}: {e}")
+        await collection.update_one({"_id": summary_id}, {"$set": {"status": "failed", "error": str(e)}})
+        raise
+
+    await collection.update_one(
+        {"_id": summary_id},
+        {"$set": {"status": "ready", "questions": questions, "finished_at": datetime.utcnow()}}
+    )
+    logger.info(f"Pre-generated {len(questions)} quiz questions for summary: {summary_id}")
+    return questions
+
+async def take_pregenerated_questions(summary_id: str) -> Optional[List[Dict[str, any]]]:
+    """
+    Claim a pre-generated quiz for a summary, waiting for it if still running.
+
+    Each pre-generated quiz is handed out once, so a later request for the
+    same summary generates fresh questions.
+
+    Returns:
+        Questions, or None if no usable pre-generation exists
+    """
+    collection = get_pregenerations_collection()
+
+    # Running in this process: wait on the task itself
+    task = _pregeneration_tasks.get(summary_id)
+    if task is not None:
+        try:
+            await asyncio.shield(task)
+        except Exception:
+            return None
+
+    # Finished here or in another process (poll briefly if still running elsewhere)
+    deadline = time.monotonic() + PREGENERATION_WAIT_SECONDS
+    while True:
+        doc = await collection.find_one_and_delete({"_id": summary_id, "status": "ready"})
+        if doc:
+            logger.info(f"Using pre-generated quiz for summary: {summary_id}")
+            return doc.get("questions")
+
+        running = await collection.find_one(
+            {
+                "_id": summary_id,
+                "status": "running",
+                "created_at": {"$gt": datetime.utcnow() - timedelta(seconds=PREGENERATION_WAIT_SECONDS)}
+            },
+            {"_id": 1}
+        )
+        if not running or time.monotonic() >= deadline:
+            return None
+
+        await asyncio.sleep(1)
@@ -0,0 +1,186 @@
+# ===========================================
+# FONTA AI STUDY COMPANION - RESPONSES
+# ===========================================
+
+"""
+Fast JSON responses and negotiated compression.
+FastJSONResponse serializes with orjson when it is installed (falling back
+to the standard library) and handles ObjectId and datetime values directly,
+so MongoDB documents can be returned as they are. CompressionMiddleware
+gzip- or brotli-compresses large buffered responses for clients that accept
+it, leaving streamed responses untouched so progress events are not held back.
+"""
+
+import os
+import json
+import gzip
+import time
+from datetime import date, datetime
+from typing import Any, Dict, Optional
+
+from bson import ObjectId
+from fastapi.responses import JSONResponse
+from starlette.datastructures import Headers, MutableHeaders
+import logging
+
+from utils.metrics import registry
+
+try:
+    import orjson
+except ImportError:  # optional: standard library JSON is used instead
+    orjson = None
+
+try:
+    import brotli
+except ImportError:  # optional: only gzip is offered
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+# Compression settings
+COMPRESSION_MIN_BYTES = int(os.getenv("COMPRESSION_MIN_BYTES", "1024"))
+GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", "6"))
+BROTLI_QUALITY = int(os.getenv("BROTLI_QUALITY", "4"))
+
+# Streamed progress must reach the client as it is produced
+STREAMING_MEDIA_TYPES = ("text/event-stream", "application/x-ndjson")
+
+compression_duration = registry.histogram(
+    "fonta_response_compression_seconds",
+    "CPU time spent compressing responses, by encoding",
+    ("encoding",),
+    buckets=(0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25)
+)
+response_bytes = registry.counter(
+    "fonta_response_bytes_total",
+    "Bytes of compressed responses before and after compression, by encoding",
+    ("encoding", "stage")
+)
+
+def _default(value: Any) -> Any:
+    """Encode the BSON/stdlib types orjson and json do not know."""
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+def render_json(content: Any) -> bytes:
+    """Serialize content to compact UTF-8 JSON."""
+    if orjson is not None:
+        return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(content, default=_default, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+def dumps(content: Any) -> str:
+    """render_json as a str (for streamed events)."""
+    return render_json(content).decode("utf-8")
+
+class FastJSONResponse(JSONResponse):
+    """JSON response using render_json (the app's default response class)."""
+
+    def render(self, content: Any) -> bytes:
+        return render_json(content)
+
+def compress(body: bytes, encoding: str) -> bytes:
+    """Compress a body with 'br' or 'gzip' at the configured level."""
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL)
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    """Best encoding the client accepts: brotli (if available), then gzip."""
+    accepted: Dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        token, _, params = part.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[token.strip().lower()] = quality
+
+    def allowed(encoding: str) -> bool:
+        return accepted.get(encoding, accepted.get("*", 0.0)) > 0
+
+    if brotli is not None and allowed("br"):
+        return "br"
+    if allowed("gzip"):
+        return "gzip"
+    return None
+
+class CompressionMiddleware:
+    """
+    ASGI middleware compressing buffered responses of at least 'minimum_size' bytes.
+
+    Streaming responses (several body messages, or event-stream/NDJSON media
+    types) and responses that are already encoded pass through unchanged.
+    """
+
+    def __init__(self, app, minimum_size: int = COMPRESSION_MIN_BYTES):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = choose_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+        passthrough = False
+
+        async def send_wrapper(message):
+            nonlocal start_message, passthrough
+
+            if message["type"] == "http.response.start":
+                headers = Headers(raw=message["headers"])
+                media_type = headers.get("content-type", "")
+                if "content-encoding" in headers or media_type.startswith(STREAMING_MEDIA_TYPES):
+                    passthrough = True
+                    await send(message)
+                else:
+                    # Hold the headers until we know whether the body is worth compressing
+                    start_message = message
+                return
+
+            if message["type"] != "http.response.body" or passthrough:
+                await send(message)
+                return
+
+            if start_message is None:
+                # Body after a streamed first chunk: already passing through
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            held, start_message = start_message, None
+
+            if message.get("more_body", False) or len(body) < self.minimum_size:
+                # Streamed or small: not worth buffering or compressing
+                passthrough = True
+                await send(held)
+                await send(message)
+                return
+
+            started = time.perf_counter()
+            compressed = compress(body, encoding)
+            compression_duration.observe(time.perf_counter() - started, encoding=encoding)
+            response_bytes.inc(len(body), encoding=encoding, stage="raw")
+            response_bytes.inc(len(compressed), encoding=encoding, stage="compressed")
+
+            headers = MutableHeaders(raw=held["headers"])
+            headers["Content-Encoding"] = encoding
+            headers["Content-Length"] = str(len(compressed))
+            headers.add_vary_header("Accept-Encoding")
+            held["headers"] = headers.raw
+
+            await send(held)
+            await send({"type": "http.response.body", "body": compressed, "more_body": False})
+
+        await self.app(scope, receive, send_wrapper)
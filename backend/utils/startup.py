@@ -0,0 +1,81 @@
+# ===========================================
+# FONTA AI STUDY COMPANION - STARTUP
+# ===========================================
+
+"""
+Startup timing and background warmup.
+The API starts accepting connections without waiting on MongoDB or the
+heavy SDK imports; those are warmed in the background, and every startup
+phase is timed so slow cold starts can be broken down.
+"""
+
+import time
+import asyncio
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+class StartupTimer:
+    """Wall time of each named startup phase, measured from process import."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.phases: List[Tuple[str, float]] = []
+        self.ready_after = None
+        self.warm = False
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases.append((name, time.perf_counter() - started))
+
+    def mark_ready(self):
+        """Record the moment the app started accepting requests."""
+        self.ready_after = time.perf_counter() - self.started
+
+    def report(self) -> Dict[str, any]:
+        return {
+            "ready_after_ms": None if self.ready_after is None else round(self.ready_after * 1000, 1),
+            "warm": self.warm,
+            "phases_ms": {name: round(seconds * 1000, 1) for name, seconds in self.phases}
+        }
+
+    def log(self, title: str):
+        breakdown = ", ".join(f"{name} {seconds * 1000:.0f} ms" for name, seconds in self.phases)
+        logger.info(f"{title} after {(time.perf_counter() - self.started) * 1000:.0f} ms: {breakdown}")
+
+# Created when app.py first imports this module (kept free of heavy imports), so it times the whole boot
+startup_timer = StartupTimer()
+
+async def warm_up():
+    """
+    Warm the MongoDB connection and heavy SDKs after the app is serving.
+
+    Failures are logged and left to surface on first use, just as before
+    warmup existed.
+    """
+    from fastapi.concurrency import run_in_threadpool
+    from lib.database import database
+    from utils.llm import load_gemini_client
+    from utils.pdf_processor import load_fitz
+
+    async def step(name: str, work):
+        try:
+            with startup_timer.phase(name):
+                await work()
+        except Exception as e:
+            logger.error(f"Warmup step '{name}' failed: {e}")
+
+    await asyncio.gather(
+        step("warmup: mongodb", database.warm_up),
+        step("warmup: gemini client", lambda: run_in_threadpool(load_gemini_client)),
+        step("warmup: pymupdf", lambda: run_in_threadpool(load_fitz))
+    )
+
+    startup_timer.warm = True
+    startup_timer.log("Warmup finished")
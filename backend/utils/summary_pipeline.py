@@ -0,0 +1,410 @@
+# ===========================================
+# FONTA AI STUDY COMPANION - SUMMARY PIPELINE
+# ===========================================
+
+"""
+Concurrent chunk summarization pipeline.
+Summarizes PDF chunks in parallel with a bounded fan-out while preserving chunk order.
+"""
+
+import os
+import time
+import asyncio
+import re
+import hashlib
+from datetime import datetime
+from typing import List, Dict, Optional, Union, Callable, Awaitable
+import logging
+
+from fastapi.concurrency import run_in_threadpool
+
+from utils import llm
+from utils.cache import TieredCache
+from utils.circuit_breaker import CircuitOpenError
+from utils.memory import MemoryTracker
+from utils.metrics import stage_duration, time_stage
+from utils.pdf_processor import PDFProcessor, PDFSource
+from utils.quiz_generator import QUIZ_PREGENERATE, schedule_quiz_pregeneration
+from lib.database import get_summaries_collection
+
+logger = logging.getLogger(__name__)
+
+# Maximum number of chunk summaries in flight per document
+CHUNK_CONCURRENCY = int(os.getenv("SUMMARY_CHUNK_CONCURRENCY", "8"))
+
+# Tree-reduce merge: summaries merged per group, and merge levels before a final merge
+MERGE_FAN_IN = int(os.getenv("SUMMARY_MERGE_FAN_IN", "8"))
+MERGE_MAX_DEPTH = int(os.getenv("SUMMARY_MERGE_MAX_DEPTH", "3"))
+
+# Largest document we accept (checked before text extraction)
+MAX_PDF_PAGES = int(os.getenv("MAX_PDF_PAGES", "400"))
+
+# Async callback receiving (event_type, payload) as the pipeline progresses
+EventCallback = Callable[[str, Dict[str, any]], Awaitable[None]]
+
+class SummarizationError(Exception):
+    """Raised when none of a document's chunks could be summarized."""
+
+# Chunk summaries are reused across documents that share chunk text
+chunk_summary_cache = TieredCache(
+    "chunk_summaries",
+    maxsize=int(os.getenv("CHUNK_CACHE_SIZE", "2048")),
+    ttl=float(os.getenv("CHUNK_CACHE_TTL_DAYS", "30")) * 24 * 3600
+)
+
+# Stands in for the chunk's page hint in cached summaries, so the same text
+# found on other pages of a revised document reuses the entry
+PAGE_HINT_PLACEHOLDER = "{{pages}}"
+
+# Bumped when the cached payload format changes (v2: page hints replaced by the placeholder)
+CHUNK_CACHE_FORMAT = 2
+
+def chunk_cache_key(text: str) -> str:
+    """Hash of whitespace-normalized chunk text and the LLM prompt version."""
+    normalized = re.sub(r"\s+", " ", text).strip()
+    digest = hashlib.sha256(normalized.encode("utf-8"))
+    digest.update(f"prompt:{llm.PROMPT_VERSION}".encode())
+    digest.update(f"format:{CHUNK_CACHE_FORMAT}".encode())
+    return digest.hexdigest()
+
+def replace_page_hint(value: any, old: Optional[str], new: str) -> any:
+    """
+    Copy of a summary with every standalone occurrence of 'old' in its strings replaced.
+
+    Used to take a chunk's page hint out of a summary before caching it
+    and to put the current chunk's hint back when the entry is reused.
+    """
+    if not old:
+        return value
+    pattern = re.compile(r"(?<!\w)" + re.escape(old) + r"(?![\w-])")
+
+    def swap(item: any) -> any:
+        if isinstance(item, str):
+            return pattern.sub(lambda _: new, item)
+        if isinstance(item, dict):
+            return {key: swap(child) for key, child in item.items()}
+        if isinstance(item, list):
+            return [swap(child) for child in item]
+        return item
+
+    return swap(value)
+
+async def summarize_chunks(
+    chunks: List[Dict[str, any]],
+    concurrency: Optional[int] = None,
+    on_result: Optional[Callable[[Dict[str, any]], Awaitable[None]]] = None
+) -> List[Dict[str, any]]:
+    """
+    Summarize chunks concurrently with a bounded fan-out.
+
+    Args:
+        chunks: Chunks produced by PDFProcessor.chunk_text
+        concurrency: Maximum chunk summaries in flight (defaults to SUMMARY_CHUNK_CONCURRENCY)
+        on_result: Optional async callback invoked with each result as soon as it completes
+
+    Returns:
+        One result per chunk, in chunk order, with 'chunk_index', 'summary'
+        (None if the chunk failed), 'error', 'cached' and 'duration_ms'
+    """
+    limit = max(1, concurrency or CHUNK_CONCURRENCY)
+    semaphore = asyncio.Semaphore(limit)
+    total = len(chunks)
+
+    async def summarize_one(chunk: Dict[str, any]) -> Dict[str, any]:
+        async with semaphore:
+            started = time.perf_counter()
+            cache_key = chunk_cache_key(chunk['text'])
+            cached = False
+            error = None
+            try:
+                # Only new or changed chunks reach the LLM; finished chunks of a
+                # failed job are picked up from the cache on retry
+                page_hint = chunk.get('page_hint')
+                summary = await chunk_summary_cache.get(cache_key)
+                cached = summary is not None
+                if cached:
+                    summary = replace_page_hint(summary, PAGE_HINT_PLACEHOLDER, page_hint or "")
+                else:
+                    summary = await llm.summarize_chunk(chunk['text'], page_hint)
+                    await chunk_summary_cache.set(cache_key, replace_page_hint(summary, page_hint, PAGE_HINT_PLACEHOLDER))
+                logger.info(f"Summarized chunk {chunk['chunk_index'] + 1}/{total}" + (" (cached)" if cached else ""))
+            except CircuitOpenError:
+                # Gemini is down: fail the document now rather than chunk by chunk
+                raise
+            except Exception as e:
+                # Per-chunk failures are tolerated; the merge uses whatever succeeded
+                summary = None
+                error = str(e)
+                logger.error(f"Error summarizing chunk {chunk['chunk_index']}: {e}")
+
+            elapsed = time.perf_counter() - started
+            stage_duration.observe(elapsed, stage="summarize_chunk_cached" if cached else "summarize_chunk")
+            result = {
+                "chunk_index": chunk['chunk_index'],
+                "summary": summary,
+                "error": error,
+                "cached": cached,
+                "duration_ms": round(elapsed * 1000, 1)
+            }
+
+        if on_result:
+            await on_result(result)
+        return result
+
+    started = time.perf_counter()
+    tasks = [asyncio.ensure_future(summarize_one(chunk)) for chunk in chunks]
+    try:
+        results = await asyncio.gather(*tasks)
+    finally:
+        # One chunk failing the document (e.g. an open circuit) stops the rest
+        for task in tasks:
+            if not task.done():
+                task.cancel()
+    elapsed_ms = (time.perf_counter() - started) * 1000
+
+    succeeded = sum(1 for result in results if result['summary'] is not None)
+    from_cache = sum(1 for result in results if result['cached'])
+    logger.info(
+        f"Summarized {succeeded}/{total} chunks ({from_cache} cached) in {elapsed_ms:.0f} ms "
+        f"(concurrency={limit})"
+    )
+    return results
+
+async def tree_merge(
+    leaves: List[Awaitable[Optional[Dict[str, any]]]],
+    fan_in: int = MERGE_FAN_IN,
+    max_depth: int = MERGE_MAX_DEPTH
+) -> Optional[Dict[str, any]]:
+    """
+    Merge chunk summaries with a parallel tree reduce.
+
+    Every group of 'fan_in' consecutive leaves is merged as soon as its own
+    members are ready, then groups of merged summaries are merged the same
+    way, level by level. The last level (or level 'max_depth') merges
+    everything left in one call, so merge latency grows with log(chunks).
+
+    Args:
+        leaves: Awaitables resolving to chunk summaries (None for failed chunks), in chunk order
+        fan_in: Summaries per merge call (at least 2)
+        max_depth: Maximum merge levels, including the final merge
+
+    Returns:
+        Final merged summary, or None if no chunk succeeded
+    """
+    fan_in = max(2, fan_in)
+    tasks: List[asyncio.Future] = []
+
+    async def merge_group(group: List[Awaitable], final: bool) -> Optional[Dict[str, any]]:
+        summaries = [summary for summary in await asyncio.gather(*group) if summary is not None]
+        if not summaries:
+            return None
+        if len(summaries) == 1 and not final:
+            # Nothing to combine at this level
+            return summaries[0]
+        with time_stage("merge"):
+            return await llm.merge_chunk_summaries(summaries)
+
+    try:
+        level = [asyncio.ensure_future(leaf) for leaf in leaves]
+        tasks.extend(level)
+        depth = 1
+
+        while len(level) > fan_in and depth < max(1, max_depth):
+            level = [
+                asyncio.ensure_future(merge_group(level[i:i + fan_in], final=False))
+                for i in range(0, len(level), fan_in)
+            ]
+            tasks.extend(level)
+            depth += 1
+
+        logger.info(f"Merging {len(leaves)} chunk summaries in {depth} level(s) (fan-in {fan_in})")
+        return await merge_group(level, final=True)
+
+    finally:
+        # Do not leave sibling merges running if one of them failed
+        for task in tasks:
+            if not task.done():
+                task.cancel()
+
+def chunk_timing(result: Dict[str, any]) -> Dict[str, any]:
+    """Timing/status view of a summarize_chunks result."""
+    return {
+        "chunk_index": result['chunk_index'],
+        "duration_ms": result['duration_ms'],
+        "status": "ok" if result['summary'] is not None else "failed",
+        "cached": result['cached']
+    }
+
+async def summarize_document(
+    content: PDFSource,
+    content_hash: str,
+    file_name: str,
+    user_id: str,
+    on_event: Optional[EventCallback] = None,
+    memory_tracker: Optional[MemoryTracker] = None
+) -> Dict[str, any]:
+    """
+    Extract, chunk, summarize, merge and store a PDF summary.
+
+    Args:
+        content: PDF bytes (or path)
+        content_hash: Key from summary_cache_key, stored for later cache hits
+        file_name: Original upload name
+        user_id: Owner of the summary
+        on_event: Optional callback receiving 'progress' and 'chunk' events
+        memory_tracker: Optional tracker started when the upload began
+
+    Returns:
+        Stored summary fields plus 'summary_id', 'chunk_timings' and 'memory'
+    """
+    # Fail fast if Gemini is down, and let the whole document through once admitted
+    with llm.gemini_breaker.admission():
+        return await _summarize_document(content, content_hash, file_name, user_id, on_event, memory_tracker)
+
+async def _summarize_document(
+    content: PDFSource,
+    content_hash: str,
+    file_name: str,
+    user_id: str,
+    on_event: Optional[EventCallback],
+    memory_tracker: Optional[MemoryTracker]
+) -> Dict[str, any]:
+    memory_tracker = memory_tracker or MemoryTracker()
+
+    async def emit(event_type: str, payload: Dict[str, any]):
+        if on_event:
+            await on_event(event_type, payload)
+
+    # Process PDF straight from the upload buffer (PyMuPDF is CPU-bound, keep it off the event loop)
+    pdf_processor = PDFProcessor(chunk_size=2000, overlap=200, max_pages=MAX_PDF_PAGES)
+    # (pages are chunked as they are extracted, so this stage covers both)
+    with time_stage("extract"):
+        pdf_data = await run_in_threadpool(pdf_processor.process_pdf, content)
+
+    memory_report = memory_tracker.report()
+    logger.info(
+        f"PDF processed: {pdf_data['pages']} pages, {len(pdf_data['chunks'])} chunks, "
+        f"RSS {memory_report['rss_mb']} MB (peak {memory_report['peak_rss_mb']} MB, "
+        f"+{memory_report['peak_growth_mb']} MB)"
+    )
+    await emit("progress", {
+        "stage": "extracted",
+        "pages": pdf_data['pages'],
+        "chunks": len(pdf_data['chunks']),
+        "total_words": pdf_data['total_words']
+    })
+
+    # Summarize chunks concurrently; the tree merge starts on each group of
+    # chunk summaries as soon as that group is complete
+    loop = asyncio.get_running_loop()
+    leaves = [loop.create_future() for _ in pdf_data['chunks']]
+    merge_task = asyncio.create_task(tree_merge(leaves))
+
+    async def on_chunk(result: Dict[str, any]):
+        leaves[result['chunk_index']].set_result(result['summary'])
+        await emit("chunk", {**chunk_timing(result), "summary": result['summary']})
+
+    try:
+        with time_stage("summarize_chunks"):
+            chunk_results = await summarize_chunks(pdf_data['chunks'], on_result=on_chunk)
+        chunks_summarized = sum(1 for r in chunk_results if r['summary'] is not None)
+
+        if not chunks_summarized:
+            raise SummarizationError("Failed to summarize any chunks")
+
+        await emit("progress", {"stage": "merging", "chunks_summarized": chunks_summarized})
+        # Merges not already overlapped with chunk summarization
+        with time_stage("merge_tail"):
+            final_summary = await merge_task
+
+    finally:
+        if not merge_task.done():
+            merge_task.cancel()
+
+    # Store in database
+    summaries_collection = get_summaries_collection()
+    summary_doc = {
+        "user_id": user_id,
+        "file_name": file_name,
+        "pages": pdf_data['pages'],
+        "total_words": pdf_data['total_words'],
+        "summary": final_summary,
+        "content_hash": content_hash,
+        "created_at": datetime.utcnow().isoformat()
+    }
+
+    with time_stage("db_insert"):
+        result = await summaries_collection.insert_one(summary_doc)
+    summary_id = str(result.inserted_id)
+
+    logger.info(f"Summary saved with ID: {summary_id}")
+
+    # Most summaries are followed by a quiz request: start on it while the user reads
+    if QUIZ_PREGENERATE:
+        schedule_quiz_pregeneration(summary_id, final_summary)
+
+    return {
+        "summary_id": summary_id,
+        "file_name": file_name,
+        "pages": pdf_data['pages'],
+        "total_words": pdf_data['total_words'],
+        "summary": final_summary,
+        "created_at": summary_doc['created_at'],
+        "chunk_timings": [chunk_timing(r) for r in chunk_results],
+        "memory": memory_report
+    }
+
+def summary_cache_key(content: Union[bytes, bytearray, "hashlib._Hash"]) -> str:
+    """
+    Content address for an uploaded PDF.
+
+    Args:
+        content: Raw PDF bytes, or a sha256 object already fed with them
+            (as returned by utils.uploads.read_upload)
+
+    Returns:
+        SHA-256 hex digest of the bytes combined with the LLM prompt version
+    """
+    if isinstance(content, (bytes, bytearray)):
+        digest = hashlib.sha256(content)
+    else:
+        digest = content.copy()
+    digest.update(f"prompt:{llm.PROMPT_VERSION}".encode())
+    return digest.hexdigest()
+
+async def find_cached_summary(content_hash: str, user_id: str, file_name: str) -> Optional[Dict[str, any]]:
+    """
+    Look up a stored summary for identical upload content.
+
+    Args:
+        content_hash: Key from summary_cache_key
+        user_id: User requesting the summary
+        file_name: Name of the new upload
+
+    Returns:
+        The user's summary document (cloned from another user's copy if needed),
+        or None on a cache miss
+    """
+    summaries_collection = get_summaries_collection()
+
+    cached = await summaries_collection.find_one(
+        {"content_hash": content_hash, "user_id": user_id}
+    )
+    if cached:
+        return cached
+
+    source = await summaries_collection.find_one({"content_hash": content_hash})
+    if not source:
+        return None
+
+    # Clone the summary so it shows up in the new user's history
+    clone = {key: value for key, value in source.items() if key not in ("_id", "user_id")}
+    clone.update({
+        "user_id": user_id,
+        "file_name": file_name,
+        "cloned_from": str(source["_id"]),
+        "created_at": datetime.utcnow().isoformat()
+    })
+    result = await summaries_collection.insert_one(clone)
+    clone["_id"] = result.inserted_id
+    return clone
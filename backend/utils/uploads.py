@@ -0,0 +1,82 @@
+# ===========================================
+# FONTA AI STUDY COMPANION - UPLOAD UTILITIES
+# ===========================================
+
+"""
+Bounded-memory upload handling.
+Reads uploads in fixed-size blocks into a single buffer, hashing as it goes,
+and rejects oversized files before they are fully buffered.
+"""
+
+import os
+import hashlib
+from typing import Tuple, Union
+import logging
+
+from fastapi import UploadFile, HTTPException
+
+logger = logging.getLogger(__name__)
+
+# Upload limits
+MAX_UPLOAD_BYTES = int(float(os.getenv("MAX_UPLOAD_MB", "100")) * 1024 * 1024)
+UPLOAD_BLOCK_SIZE = 1024 * 1024
+
+async def read_upload(
+    file: UploadFile,
+    max_bytes: int = MAX_UPLOAD_BYTES,
+    block_size: int = UPLOAD_BLOCK_SIZE
+) -> Tuple[bytearray, "hashlib._Hash"]:
+    """
+    Stream an upload into memory in fixed-size blocks.
+
+    Args:
+        file: Incoming upload
+        max_bytes: Reject uploads larger than this with a 413
+        block_size: Bytes read per block
+
+    Returns:
+        Tuple of (buffer, sha256 digest object fed with the upload bytes)
+    """
+    declared_size = getattr(file, "size", None)
+    if declared_size and declared_size > max_bytes:
+        raise HTTPException(
+            status_code=413,
+            detail=f"File too large. Maximum upload size is {max_bytes // (1024 * 1024)} MB"
+        )
+
+    buffer = bytearray()
+    digest = hashlib.sha256()
+
+    while True:
+        block = await file.read(block_size)
+        if not block:
+            break
+
+        if len(buffer) + len(block) > max_bytes:
+            raise HTTPException(
+                status_code=413,
+                detail=f"File too large. Maximum upload size is {max_bytes // (1024 * 1024)} MB"
+            )
+
+        buffer += block
+        digest.update(block)
+
+    return buffer, digest
+
+class BufferReader:
+    """
+    Read-only file-like view of an upload buffer.
+
+    For APIs that want a stream (e.g. GridFS): each read() copies only the
+    requested block, never the whole buffer.
+    """
+
+    def __init__(self, buffer: Union[bytes, bytearray, memoryview]):
+        self._view = memoryview(buffer)
+        self._position = 0
+
+    def read(self, size: int = -1) -> bytes:
+        end = len(self._view) if size is None or size < 0 else min(len(self._view), self._position + size)
+        block = bytes(self._view[self._position:end])
+        self._position = end
+        return block
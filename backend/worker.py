@@ -0,0 +1,58 @@
+# ===========================================
+# FONTA AI STUDY COMPANION - SUMMARY WORKER
+# ===========================================
+
+"""
+Standalone summary worker process.
+Processes queued summarization jobs so workers can be scaled separately
+from the API processes (run the API with SUMMARY_WORKERS=0).
+
+Usage:
+    python worker.py
+"""
+
+import os
+import asyncio
+import signal
+import logging
+from dotenv import load_dotenv
+
+# Load environment variables before the modules that read them
+load_dotenv()
+
+from lib.database import database
+from utils.job_queue import SummaryWorkerPool
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+async def main():
+    """Connect to MongoDB and run the worker pool until interrupted."""
+    await database.connect()
+
+    concurrency = int(os.getenv("SUMMARY_WORKER_CONCURRENCY", "4"))
+    pool = SummaryWorkerPool(concurrency)
+    pool.start()
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop.set)
+        except NotImplementedError:  # Windows
+            pass
+
+    try:
+        await stop.wait()
+    finally:
+        await pool.stop()
+        await database.disconnect()
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass